@@ -1,33 +1,327 @@
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse
-import cv2
-import numpy as np
-import mediapipe as mp
-
-app = FastAPI()
-
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose()
-
-def is_side_sleeping(pose_landmarks):
-    left_eye = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_EYE]
-    right_eye = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_EYE]
-    left_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER]
-    right_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_SHOULDER]
-    # Check if the horizontal distance between eyes is very small, indicating a sideways roll
-    eye_distance = abs(left_eye.x - right_eye.x)
-    if eye_distance < 0.02:  # Adjust threshold based on testing
-        return True
-    return False
+import time
+# Import time is reported by /ready; measured from before the heavy imports
+IMPORT_STARTED = time.perf_counter()
+import asyncio
+import struct
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+import os
+import sys
+
+# Shared posture checks live in posture-detection/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "posture-detection"))
+from pose_pool import PosePool
+from posture_classifier import LANDMARK_PAYLOAD_BYTES, PostureClassifier, unpack_landmarks
+from result_cache import ResultCache, frame_hash
+from metrics import CONTENT_TYPE, Registry
+
+# Prometheus metrics served on /metrics
+metrics = Registry()
+stage_seconds = metrics.histogram("pose_stage_seconds", "Worker latency per stage (decode, inference)",
+                                  labels=("stage",))
+request_seconds = metrics.histogram("request_seconds", "Request latency including queueing for a worker",
+                                    labels=("endpoint",))
+frames_total = metrics.counter("frames_total", "Frames received", labels=("endpoint",))
+postures_total = metrics.counter("postures_total", "Classified frames per posture label", labels=("posture",))
+alerts_total = metrics.counter("alerts_total", "Responses per alert message", labels=("alert",))
+decode_errors_total = metrics.counter("decode_errors_total", "Frames that could not be decoded")
+
+# Most frames one /ws/process-frames connection may have in flight; clients can ask for fewer
+STREAM_MAX_IN_FLIGHT = int(os.environ.get("STREAM_MAX_IN_FLIGHT", 8))
+
+pose_pool = PosePool(posture_profile="api", inference_profile="server", histogram=stage_seconds)
+
+# Landmarks uploaded by Pis that run pose themselves are classified in-process with the same thresholds
+landmark_classifier = PostureClassifier(pose_pool.posture_profile)
+# Most frames accepted by one /process-landmarks/ request
+MAX_LANDMARK_BATCH = int(os.environ.get("MAX_LANDMARK_BATCH", 1024))
+
+# Reuse the verdict for near-identical frames from the same camera; RESULT_CACHE_TTL=0 disables it
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 5.0))
+result_cache = None
+if RESULT_CACHE_TTL > 0:
+    result_cache = ResultCache(max_entries=int(os.environ.get("RESULT_CACHE_SIZE", 32)), ttl=RESULT_CACHE_TTL,
+                               max_distance=int(os.environ.get("RESULT_CACHE_DISTANCE", 4)))
+cache_lookups_total = metrics.counter("result_cache_lookups_total", "Result cache lookups per camera",
+                                      labels=("camera", "result"))
+metrics.gauge("result_cache_entries", "Frame hashes held in the result cache",
+              func=lambda: len(result_cache) if result_cache is not None else 0)
+
+metrics.gauge("pose_pending_frames", "Frames waiting for or running in a pose worker",
+              func=lambda: pose_pool.pending)
+metrics.gauge("pose_workers", "Pose worker processes", func=lambda: pose_pool.workers)
+metrics.counter("pose_pool_restarts_total", "Pose pools rebuilt after a worker died",
+                func=lambda: pose_pool.restarts)
+
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+# Set once the pose workers are warmed up (or failed to start); /ready reports it
+startup_done = asyncio.Event()
+startup_report = {"import_s": IMPORT_SECONDS}
+startup_error = None
+
+
+async def warm_up():
+    """
+    Start the pose workers (each builds and warms its graph), then send one
+    synthetic frame through the whole decode and inference path.
+    """
+    global startup_error
+    try:
+        start = time.perf_counter()
+        await pose_pool.start()
+        startup_report["init_s"] = time.perf_counter() - start
+        startup_report["first_inference_s"] = await pose_pool.warm_up()
+        startup_report["workers"] = list(pose_pool.startup.values())
+        print(f"Ready: import {startup_report['import_s']:.2f} s, init {startup_report['init_s']:.2f} s, "
+              f"first inference {startup_report['first_inference_s'] * 1000:.0f} ms")
+    except Exception as e:
+        startup_error = e
+        print(f"Startup failed: {e}")
+    finally:
+        startup_done.set()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background so the port is bound (and /ready answers) straight away
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    pose_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+
+def is_unsafe(posture):
+    return posture in ("tummy", "side")
+
+
+def alert_for(posture):
+    if is_unsafe(posture):
+        return "Unsafe position detected!"
+    return "Safe position"
+
+
+def camera_scope(connection):
+    """
+    Cache scope of a request: the X-Camera-Id header or ?camera=, else None.
+    The client address is not used: behind a proxy every camera shares it.
+    """
+    return connection.headers.get("x-camera-id") or connection.query_params.get("camera")
+
+
+async def classify(contents, scope):
+    """Posture for one JPEG, from the result cache when a near-identical frame was seen recently."""
+    # Frames that arrive during warm-up wait for the pose workers
+    await startup_done.wait()
+    if startup_error is not None:
+        raise HTTPException(status_code=503, detail="Pose workers failed to start")
+    try:
+        return await classify_cached(contents, scope)
+    except BrokenProcessPool:
+        # A worker died with this frame queued; the pool is rebuilt in the background
+        raise HTTPException(status_code=503, detail="Pose workers restarting")
+
+
+async def classify_cached(contents, scope):
+    if result_cache is None or scope is None:
+        # Without a camera id, a near-duplicate frame could get another crib's verdict
+        return await pose_pool.classify(contents)
+    # The hash needs only a 1/8 scale grayscale decode; keep it off the event loop anyway
+    key = await asyncio.to_thread(frame_hash, contents)
+    if key is None:
+        # Not a decodable JPEG; the full decode in a worker would fail too
+        return None
+    posture = result_cache.lookup(scope, key)
+    if posture is not None:
+        cache_lookups_total.inc(scope, "hit")
+        return posture
+    cache_lookups_total.inc(scope, "miss")
+    posture = await pose_pool.classify(contents)
+    if posture is not None:
+        result_cache.store(scope, key, posture)
+    return posture
+
+
+def record_result(posture):
+    """Count one classified frame; returns its alert message."""
+    if posture is None:
+        decode_errors_total.inc()
+        return None
+    alert = alert_for(posture)
+    postures_total.inc(posture)
+    alerts_total.inc(alert)
+    return alert
+
+
 @app.post("/process-frame/")
-async def process_frame(file: UploadFile = File(...)):
+async def process_frame(request: Request, file: UploadFile = File(...)):
+    start = time.perf_counter()
     contents = await file.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    frames_total.inc("process-frame")
+    posture = await classify(contents, camera_scope(request))
+    alert = record_result(posture)
+    request_seconds.observe(time.perf_counter() - start, "process-frame")
+    if alert is None:
+        raise HTTPException(status_code=400, detail="Could not decode image")
+    return JSONResponse(content={"alert": alert})
+
+
+@app.post("/process-frames/")
+async def process_frames(request: Request, files: List[UploadFile] = File(...)):
+    """
+    Batch version of /process-frame/: one result per uploaded frame, in order.
+    """
+    start = time.perf_counter()
+    frames = [await file.read() for file in files]
+    frames_total.inc("process-frames", amount=len(frames))
+    scope = camera_scope(request)
+    postures = await asyncio.gather(*(classify(contents, scope) for contents in frames))
+    results = []
+    for file, posture in zip(files, postures):
+        alert = record_result(posture)
+        if alert is None:
+            results.append({"filename": file.filename, "error": "Could not decode image"})
+        else:
+            results.append({"filename": file.filename, "alert": alert})
+    request_seconds.observe(time.perf_counter() - start, "process-frames")
+    return JSONResponse(content={"results": results})
+
+
+async def classify_landmarks(request, endpoint, max_frames):
+    """Read and classify a landmark upload; returns the posture label of each frame."""
+    start = time.perf_counter()
+    body = await request.body()
+    try:
+        frames = unpack_landmarks(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(frames) > max_frames:
+        raise HTTPException(status_code=413, detail=f"At most {max_frames} frame(s) of "
+                                                    f"{LANDMARK_PAYLOAD_BYTES} bytes per request")
+    frames_total.inc(endpoint, amount=len(frames))
+    # One NumPy pass over the batch: microseconds, so it runs on the event loop, not in a pose worker
+    postures = landmark_classifier.labels(landmark_classifier.classify_batch(frames))
+    for posture in postures:
+        record_result(posture)
+    request_seconds.observe(time.perf_counter() - start, endpoint)
+    return postures
+
+
+def landmark_result(posture):
+    return {"alert": alert_for(posture), "posture": posture, "unsafe": is_unsafe(posture)}
+
+
+@app.post("/process-landmark/")
+async def process_landmark(request: Request):
+    """
+    Landmark-only version of /process-frame/ for clients that run pose
+    themselves. The body is one frame as 33 x 4 little-endian float32
+    (x, y, z, visibility; NaN when no pose was found), 528 bytes.
+    """
+    postures = await classify_landmarks(request, "process-landmark", 1)
+    return JSONResponse(content=landmark_result(postures[0]))
+
+
+@app.post("/process-landmarks/")
+async def process_landmarks(request: Request):
+    """Batch version of /process-landmark/: frames concatenated, one result per frame, in order."""
+    postures = await classify_landmarks(request, "process-landmarks", MAX_LANDMARK_BATCH)
+    return JSONResponse(content={"results": [landmark_result(posture) for posture in postures]})
+
+
+@app.websocket("/ws/process-frames")
+async def process_frames_stream(websocket: WebSocket, max_in_flight: int = STREAM_MAX_IN_FLIGHT):
+    """
+    Streaming version of /process-frame/ over one persistent connection.
+
+    Each binary message is a 4-byte big-endian sequence number followed by a
+    JPEG. Each reply is a JSON text message {"seq", "alert"} or {"seq", "error"},
+    sent as soon as that frame is classified, so replies can arrive out of
+    order. The first message from the server is {"max_in_flight": n}; no more
+    frames are read while n are being processed.
+    """
+    await websocket.accept()
+    scope = camera_scope(websocket)
+    window = max(1, min(max_in_flight, STREAM_MAX_IN_FLIGHT))
+    await websocket.send_json({"max_in_flight": window})
+    slots = asyncio.Semaphore(window)
+    send_lock = asyncio.Lock()
+    tasks = set()
+
+    async def reply(message):
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def handle(seq, contents, start):
+        try:
+            try:
+                posture = await classify(contents, scope)
+            except HTTPException as e:
+                message = {"seq": seq, "error": e.detail}
+            except Exception as e:
+                # A broken or failing pose worker: tell the client rather than let it time out
+                message = {"seq": seq, "error": f"Inference failed: {e}"}
+            else:
+                alert = record_result(posture)
+                request_seconds.observe(time.perf_counter() - start, "ws-process-frames")
+                if alert is None:
+                    message = {"seq": seq, "error": "Could not decode image"}
+                else:
+                    message = {"seq": seq, "alert": alert}
+            await reply(message)
+        except (WebSocketDisconnect, RuntimeError):
+            # The client went away while this frame was being classified
+            pass
+        finally:
+            slots.release()
+
+    try:
+        while True:
+            # Stop reading (and let TCP push back) while the window is full
+            await slots.acquire()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            start = time.perf_counter()
+            data = message.get("bytes")
+            if data is None or len(data) < 5:
+                slots.release()
+                await reply({"seq": None, "error": "Expected a 4-byte sequence number followed by a JPEG"})
+                continue
+            frames_total.inc("ws-process-frames")
+            seq = struct.unpack_from(">I", data)[0]
+            task = asyncio.create_task(handle(seq, data[4:], start))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 503 until the pose workers are built and a synthetic
+    frame has been classified, then the startup timings. 503 again while
+    the pool is rebuilt after a worker died.
+    """
+    if not startup_done.is_set():
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    if startup_error is not None:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": str(startup_error)})
+    if not pose_pool.healthy:
+        # A worker died and the pool is being rebuilt
+        return JSONResponse(status_code=503, content={"status": "restarting"})
+    return JSONResponse(content={"status": "ready", "startup": startup_report})
 
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(frame_rgb)
 
-    if results.pose_landmarks and is_side_sleeping(results.pose_landmarks):
-        return JSONResponse(content={"alert": "Unsafe position detected!"})
-    return JSONResponse(content={"alert": "Safe position"})
\ No newline at end of file
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
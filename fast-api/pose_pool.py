@@ -0,0 +1,175 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from backoff import Backoff
+from inference_profiles import create_pose, load_profile
+from posture_classifier import PostureClassifier
+
+# Per-process state, created once by _init_worker
+_pose = None
+_classifier = None
+_max_side = None
+_startup = None
+
+
+def _init_worker(posture_profile, inference_profile):
+    """Build and warm up the MediaPipe graph in each worker process."""
+    global _pose, _classifier, _max_side, _startup
+    # cv2 and mediapipe are imported here, in the workers, rather than by the server
+    # process at startup or by the first request
+    start = time.perf_counter()
+    import cv2  # noqa: F401
+    _pose = create_pose(inference_profile)
+    _classifier = PostureClassifier(posture_profile)
+    _max_side = inference_profile["max_side"]
+    initialised = time.perf_counter()
+    # The first process() call initialises the graph; pay it here, not in a request
+    _pose.process(np.zeros((256, 256, 3), dtype=np.uint8))
+    _startup = {"init_s": initialised - start, "first_inference_s": time.perf_counter() - initialised}
+
+
+def _ready():
+    return os.getpid(), _startup
+
+
+def synthetic_jpeg(size=256):
+    """A small noise JPEG for exercising the full request path at startup."""
+    import cv2
+
+    frame = np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def classify_jpeg(contents):
+    """
+    Decode a JPEG and run pose inference in a worker process.
+    Returns (posture label, decode seconds, inference seconds); the label is
+    None if the image could not be decoded.
+    """
+    import cv2
+
+    start = time.perf_counter()
+    frame = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+    decoded = time.perf_counter()
+    if frame is None:
+        return None, decoded - start, 0.0
+    # Frames from different cameras are unrelated, so only downscale (no ROI tracking)
+    scale = _max_side / max(frame.shape[:2])
+    if scale < 1:
+        frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    results = _pose.process(frame_rgb)
+    posture = _classifier.classify(results.pose_landmarks)
+    return posture, decoded - start, time.perf_counter() - decoded
+
+
+class PosePool:
+    """
+    Pool of pre-warmed Pose workers, one per process.
+
+    The async handlers await `classify` so decoding and inference never run
+    on the event loop. Worker-side decode and inference times are observed
+    in `histogram` (a metrics.Histogram labelled by stage) if one is given.
+
+    If a worker dies the executor is broken for good: `healthy` goes False,
+    the frame that found it raises BrokenProcessPool, and a new pool is
+    built and warmed in the background. Frames submitted meanwhile wait for it.
+    """
+
+    def __init__(self, workers=None, posture_profile="api", inference_profile="server", histogram=None):
+        self.workers = workers or int(os.environ.get("POSE_WORKERS", 0)) or os.cpu_count() or 1
+        self.posture_profile = posture_profile
+        # INFERENCE_PROFILE overrides the default, e.g. "pi4" on a small host
+        self.inference_profile_name, self.inference_profile = load_profile(inference_profile)
+        self.histogram = histogram
+        # Frames submitted and not yet classified (waiting for or running in a worker)
+        self.pending = 0
+        self.startup = {}
+        self.healthy = False
+        self.restarts = 0
+        self._executor = None
+        self._restarting = None
+
+    async def start(self):
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             initializer=_init_worker,
+                                             initargs=(self.posture_profile, self.inference_profile))
+        # One task per worker so every process is spawned and warmed before serving
+        loop = asyncio.get_running_loop()
+        ready = await asyncio.gather(*(loop.run_in_executor(self._executor, _ready)
+                                       for _ in range(self.workers)))
+        # pid -> {"init_s", "first_inference_s"} of each worker's Pose graph
+        self.startup = dict(ready)
+        self.healthy = True
+
+    async def warm_up(self):
+        """
+        Classify a synthetic JPEG through the whole worker path (decode, resize,
+        inference); returns the seconds it took. Not counted in the metrics.
+        """
+        contents = await asyncio.to_thread(synthetic_jpeg)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        await loop.run_in_executor(self._executor, classify_jpeg, contents)
+        return time.perf_counter() - start
+
+    def shutdown(self):
+        self.healthy = False
+        if self._restarting is not None:
+            self._restarting.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def classify(self, contents):
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            if self._restarting is not None:
+                # Shielded: a cancelled request must not cancel the rebuild
+                await asyncio.shield(self._restarting)
+            executor = self._executor
+            posture, decode_seconds, inference_seconds = await loop.run_in_executor(
+                executor, classify_jpeg, contents)
+        except BrokenProcessPool:
+            # Frames queued on the old pool fail after it was replaced; rebuild only once
+            if executor is self._executor:
+                self._rebuild()
+            raise
+        finally:
+            self.pending -= 1
+        if self.histogram is not None:
+            self.histogram.observe(decode_seconds, "decode")
+            if posture is not None:
+                self.histogram.observe(inference_seconds, "inference")
+        return posture
+
+    def _rebuild(self):
+        if self._restarting is None:
+            self.healthy = False
+            print("A pose worker died; rebuilding the pool")
+            self._restarting = asyncio.create_task(self._restart())
+
+    async def _restart(self):
+        broken, self._executor = self._executor, None
+        broken.shutdown(wait=False, cancel_futures=True)
+        backoff = Backoff(1.0, 30.0)
+        try:
+            while True:
+                try:
+                    await self.start()
+                    break
+                except Exception as e:
+                    if self._executor is not None:
+                        self._executor.shutdown(wait=False, cancel_futures=True)
+                        self._executor = None
+                    print(f"Pose pool restart failed: {e}")
+                    await asyncio.sleep(backoff.next())
+            self.restarts += 1
+        finally:
+            self._restarting = None
@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def frame_hash(contents, size=8):
+    """
+    64-bit difference hash of a JPEG, or None if it cannot be decoded.
+
+    The JPEG is decoded straight to 1/8 scale grayscale (far cheaper than a
+    full decode), shrunk to (size + 1) x size and each bit records whether a
+    pixel is brighter than its right-hand neighbour. Small changes in
+    lighting or sensor noise flip few bits; a baby rolling over flips many.
+    """
+    # Imported on first use, so loading OpenCV is not part of importing the app
+    import cv2
+
+    thumb = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if thumb is None:
+        return None
+    thumb = cv2.resize(thumb, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(thumb[:, 1:] > thumb[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+class ResultCache:
+    """
+    Posture verdicts for recently seen frames, per client or camera.
+
+    A lookup hits when a stored hash of the same scope is within
+    `max_distance` bits. Only inference results are stored and a hit does
+    not refresh an entry, so every verdict is re-checked by a real inference
+    at least every `ttl` seconds, however still the scene is. Each scope
+    keeps its `max_entries` most recently used hashes; the `max_scopes`
+    least recently used scopes are forgotten first.
+
+    Not thread-safe: it is only used from the event loop.
+    """
+
+    def __init__(self, max_entries=32, ttl=5.0, max_distance=4, max_scopes=1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.max_scopes = max_scopes
+        # scope -> OrderedDict(hash -> (posture, stored_at)), least recently used first
+        self._scopes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._scopes.values())
+
+    def lookup(self, scope, key, now=None):
+        """Return the cached posture for a frame close to `key`, or None."""
+        now = time.monotonic() if now is None else now
+        entries = self._scopes.get(scope)
+        if entries is not None:
+            self._scopes.move_to_end(scope)
+            best = None
+            for cached, (posture, stored_at) in list(entries.items()):
+                if now - stored_at > self.ttl:
+                    del entries[cached]
+                    continue
+                distance = (cached ^ key).bit_count()
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, cached, posture)
+            if best is not None:
+                entries.move_to_end(best[1])
+                self.hits += 1
+                return best[2]
+        self.misses += 1
+        return None
+
+    def store(self, scope, key, posture, now=None):
+        now = time.monotonic() if now is None else now
+        entries = self._scopes.get(scope)
+        if entries is None:
+            if len(self._scopes) >= self.max_scopes:
+                self._scopes.popitem(last=False)
+            entries = self._scopes[scope] = OrderedDict()
+        self._scopes.move_to_end(scope)
+        entries[key] = (posture, now)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
@@ -1,38 +1,36 @@
 import cv2
 import mediapipe as mp
+from posture_classifier import PostureClassifier
+from motion_gate import MotionGate
+from roi_tracker import RoiTracker
+from inference_profiles import create_pose, load_profile
+from stage_timer import StageTimer
+from live_pipeline import DisplaySink, LivePipeline, VideoFileSink
 
 # Initialize Mediapipe pose and drawing classes
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
 
-# Function to check for tummy sleeping using alignment of shoulders and head
-def is_tummy_sleeping(pose_landmarks):
-    nose = pose_landmarks.landmark[mp_pose.PoseLandmark.NOSE]
-    left_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER]
-    right_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_SHOULDER]
-    if abs(left_shoulder.x-right_shoulder.x)<0.3:
-        return True
-    return False
-
-# Function to check if the baby is sleeping sideways based on eye proximity
-def is_side_sleeping(pose_landmarks):
-    left_eye = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_EYE]
-    right_eye = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_EYE]
-    nose = pose_landmarks.landmark[mp_pose.PoseLandmark.NOSE]
-    left_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER]
-    right_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_SHOULDER]
-    eye_distance = abs(left_eye.x - right_eye.x)
-    if abs(left_shoulder.x-right_shoulder.x)<0.3:
-        return True
-    
-
-    # Check if the horizontal distance between eyes is very small, indicating a sideways roll
-    elif eye_distance < 0.07:  # Adjust threshold based on testing
-        return True
-    return False
+# Posture checks shared with the other detection scripts
+classifier = PostureClassifier("webcam")
 
 # Initialize Mediapipe pose object
-pose = mp_pose.Pose()
+# Pose settings for this device; override with INFERENCE_PROFILE
+profile_name, profile = load_profile("desktop")
+print(f"Inference profile: {profile_name}")
+pose = create_pose(profile)
+
+# Skip pose inference while the crib scene is still
+motion_gate = MotionGate(max_interval=10.0, report_interval=60.0)
+results = None
+
+# Run pose on a crop around the baby; set a crib rectangle (x0, y0, x1, y1) in pixels to limit it
+CRIB_RECT = None
+roi_tracker = RoiTracker(crib_rect=CRIB_RECT, max_side=profile["max_side"],
+                         reset_on_move=not profile["static_image_mode"])
+
+# Per-stage and glass-to-alert latency, printed every minute
+timer = StageTimer(report_interval=60.0)
 
 # Start capturing video from the webcam
 cap = cv2.VideoCapture(0)
@@ -41,36 +39,57 @@ if not cap.isOpened():
     print("Error: Could not open the camera.")
     exit()
 
-while True:
+# Keep only the newest frame in the driver buffer (ignored by some backends)
+cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+# Set a path to also record the annotated feed
+RECORD_PATH = None
+
+
+def capture():
     ret, frame = cap.read()
+    return frame if ret else None
+
+
+def infer(frame):
+    global results
+    # Reuse the last result unless the scene changed
+    if motion_gate.should_infer(frame):
+        # Crop, downscale and convert to RGB, then map landmarks back to the full frame
+        results = roi_tracker.process(pose, frame, timer=timer)
 
-    if not ret:
-        print("Error: Failed to capture image.")
-        break
+    # Check for unsafe sleeping patterns
+    with timer.stage("classify"):
+        posture = classifier.classify(results.pose_landmarks)
+    return results, posture
 
-    # Convert the frame to RGB as Mediapipe works with RGB images
-    image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(image_rgb)
 
-    if results.pose_landmarks:
+def annotate(packet):
+    frame = packet.frame
+    if packet.results.pose_landmarks:
         # Draw pose landmarks on the frame
-        mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+        mp_drawing.draw_landmarks(frame, packet.results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
 
-        # Check for unsafe sleeping patterns
-        if is_tummy_sleeping(results.pose_landmarks):
+        if packet.posture == "tummy":
             cv2.putText(frame, 'Alert: Baby is sleeping on tummy!', (50, 50), 
                         cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
         
         # Check for side-sleeping position
-        elif is_side_sleeping(results.pose_landmarks):
+        elif packet.posture == "side":
             cv2.putText(frame, 'Alert: Baby is sleeping on side!', (50, 100), 
                         cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+    return frame
 
-    # Show the video feed
-    cv2.imshow('Baby Movement Detection', frame)
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+# Show the video feed; press 'q' to quit
+sinks = [DisplaySink('Baby Movement Detection')]
+if RECORD_PATH:
+    sinks.append(VideoFileSink(RECORD_PATH))
 
-cap.release()
-cv2.destroyAllWindows()
+# Capture, inference and display each run on their own thread
+pipeline = LivePipeline(capture, infer, sinks=sinks, annotate=annotate, timer=timer)
+try:
+    pipeline.run()
+finally:
+    print(motion_gate.summary())
+    cap.release()
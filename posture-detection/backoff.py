@@ -0,0 +1,37 @@
+import time
+
+
+class Backoff:
+    """Exponential backoff delays: `initial` seconds, doubling up to `maximum`."""
+
+    def __init__(self, initial, maximum):
+        self.initial = initial
+        self.maximum = maximum
+        self._delay = initial
+
+    def next(self):
+        delay = self._delay
+        self._delay = min(self._delay * 2, self.maximum)
+        return delay
+
+    def reset(self):
+        self._delay = self.initial
+
+
+def retry(fn, *args, retries=3, backoff=0.5, max_backoff=30.0, on_retry=None, give_up=None):
+    """
+    Call `fn(*args)`, retrying up to `retries` times with exponential backoff
+    if it raises. `on_retry(error)` is called before each wait; `give_up()`
+    returning True (e.g. while shutting down) stops retrying. The last error
+    is re-raised.
+    """
+    delays = Backoff(backoff, max_backoff)
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == retries or (give_up is not None and give_up()):
+                raise
+            if on_retry is not None:
+                on_retry(e)
+            time.sleep(delays.next())
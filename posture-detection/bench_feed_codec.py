@@ -0,0 +1,95 @@
+"""
+Benchmark: CPU per frame and output bitrate of the processed-feed codec settings.
+
+Each setting decodes the upstream JPEG for inference, then renders the
+viewer JPEG with an overlay (landmarks drawn) and without one (passthrough
+when enabled). Pose itself is left out; see bench_inference_profiles.py.
+
+Usage: python bench_feed_codec.py [CLIPS] [--frames 200] [--fps 15] [--upstream-quality 90]
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from feed_codec import FeedCodec
+from recordings import find_clips, iter_frames
+
+# (name, inference_reduction, quality, max_side, passthrough)
+SETTINGS = (
+    ("full decode, q95", 1, 95, None, False),  # the feed before FeedCodec
+    ("reduced 2, q95", 2, 95, None, False),
+    ("reduced 2, q80", 2, 80, None, True),
+    ("reduced 2, q80, 640", 2, 80, 640, True),
+    ("reduced 2, q70, 480", 2, 70, 480, True),
+    ("reduced 4, q70, 320", 4, 70, 320, True),
+)
+
+
+def synthetic_frames(count, width=1280, height=720):
+    # Smooth crib-like scene with a moving blob, so JPEG sizes are realistic
+    rng = np.random.default_rng(0)
+    base = np.zeros((height, width, 3), np.uint8)
+    base[:] = np.linspace(60, 160, width, dtype=np.uint8)[None, :, None]
+    for i in range(count):
+        frame = base.copy()
+        cv2.ellipse(frame, (width // 2 + (i % 40) * 4, height // 2), (180, 90), 0, 0, 360, (200, 180, 170), -1)
+        frame += rng.integers(0, 6, frame.shape, dtype=np.uint8)
+        yield frame
+
+
+def fake_overlay(frame):
+    # Roughly what draw_landmarks + putText cost: 33 points, 35 lines, one string
+    height, width = frame.shape[:2]
+    points = [(int(width * (0.3 + 0.012 * i)), int(height * (0.3 + 0.01 * (i % 7)))) for i in range(33)]
+    for a, b in zip(points, points[1:] + points[:2]):
+        cv2.line(frame, a, b, (255, 255, 255), 2)
+    for point in points:
+        cv2.circle(frame, point, 3, (0, 0, 255), -1)
+    cv2.putText(frame, 'Normal: Baby is in a safe position.', (50, 150),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
+
+
+def run(jpegs, setting, overlay):
+    name, reduction, quality, max_side, passthrough = setting
+    codec = FeedCodec(inference_reduction=reduction, quality=quality, max_side=max_side, passthrough=passthrough)
+    out_bytes = 0
+    start = time.process_time()
+    for jpg in jpegs:
+        small = codec.decode_for_inference(jpg)
+        out_bytes += len(codec.render(jpg, small, fake_overlay if overlay else None))
+    cpu = time.process_time() - start
+    return cpu / len(jpegs) * 1000, out_bytes / len(jpegs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clips", nargs="?", help="recordings to use instead of synthetic 720p frames")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--fps", type=float, default=15.0, help="feed rate used for the bitrate column")
+    parser.add_argument("--upstream-quality", type=int, default=90, help="JPEG quality of the simulated Pi feed")
+    args = parser.parse_args()
+
+    if args.clips:
+        frames = (frame for clip in find_clips(args.clips) for frame in iter_frames(clip))
+    else:
+        frames = synthetic_frames(args.frames)
+    jpegs = []
+    for frame in frames:
+        jpegs.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, args.upstream_quality])[1].tobytes())
+        if len(jpegs) == args.frames:
+            break
+    upstream_kb = sum(len(jpg) for jpg in jpegs) / len(jpegs) / 1024
+    print(f"{len(jpegs)} frames, upstream {upstream_kb:.0f} KB/frame, "
+          f"{upstream_kb * 8 * args.fps / 1024:.1f} Mbit/s at {args.fps:g} fps")
+    print(f"{'setting':<22} {'overlay':>8} {'CPU ms':>7} {'KB/frame':>9} {'Mbit/s':>7}")
+    for setting in SETTINGS:
+        for overlay in (True, False):
+            cpu_ms, size = run(jpegs, setting, overlay)
+            mbit = size * 8 * args.fps / (1024 * 1024)
+            print(f"{setting[0]:<22} {'yes' if overlay else 'no':>8} {cpu_ms:7.2f} {size / 1024:9.1f} {mbit:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
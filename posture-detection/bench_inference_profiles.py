@@ -0,0 +1,77 @@
+"""
+Benchmark every inference profile over a directory of recorded clips.
+
+Reports fps, per-frame latency percentiles, peak RSS and how often each
+profile's posture labels agree with the heaviest profile.
+
+Usage: python bench_inference_profiles.py CLIPS_DIR [--profiles pi4,desktop] [--posture webcam]
+"""
+import argparse
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from inference_profiles import INFERENCE_PROFILES, create_pose, heaviest_profile
+from posture_classifier import PostureClassifier
+from recordings import find_clips, iter_frames
+from roi_tracker import RoiTracker
+
+
+def run_profile(name, clips, posture_profile):
+    """Run one profile over all clips. Runs in its own process so peak RSS is per profile."""
+    profile = INFERENCE_PROFILES[name]
+    classifier = PostureClassifier(posture_profile)
+    latencies = []
+    labels = []
+    for clip in clips:
+        # Fresh graph and tracker per clip so tracking state does not leak between recordings
+        pose = create_pose(profile)
+        tracker = RoiTracker(max_side=profile["max_side"], reset_on_move=not profile["static_image_mode"])
+        for frame in iter_frames(clip):
+            start = time.perf_counter()
+            results = tracker.process(pose, frame)
+            latencies.append(time.perf_counter() - start)
+            labels.append(classifier.classify(results.pose_landmarks))
+        pose.close()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+    return latencies, labels, peak_rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clips", help="directory of MP4 files and/or JPEG frame directories")
+    parser.add_argument("--profiles", default=",".join(INFERENCE_PROFILES))
+    parser.add_argument("--posture", default="webcam", help="posture threshold profile")
+    args = parser.parse_args()
+
+    names = args.profiles.split(",")
+    clips = find_clips(args.clips)
+    if not clips:
+        parser.error(f"No recordings found in {args.clips}")
+    reference = heaviest_profile(names)
+
+    runs = {}
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            runs[name] = executor.submit(run_profile, name, clips, args.posture).result()
+
+    reference_labels = runs[reference][1]
+    print(f"{len(clips)} clip(s), {len(reference_labels)} frames, reference profile: {reference}")
+    print(f"{'profile':<10} {'fps':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'RSS MB':>8} {'agree':>7}")
+    for name in names:
+        latencies, labels, peak_rss_mb = runs[name]
+        ms = np.array(latencies) * 1000
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        agree = np.mean([a == b for a, b in zip(labels, reference_labels)]) * 100
+        print(f"{name:<10} {len(ms) / ms.sum() * 1000:7.1f} {p50:8.1f} {p90:8.1f} {p99:8.1f} "
+              f"{peak_rss_mb:8.0f} {agree:6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: the old `bytes_buffer += chunk` MJPEG loop vs MJPEGDemuxer.
+
+Usage: python bench_mjpeg_demuxer.py [--frames 300] [--frame-kb 120] [--read-size 16384]
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+
+from mjpeg_demuxer import MJPEGDemuxer
+
+
+# The loop from flask_api_detection.generate_frames before the demuxer
+def legacy_frames(stream, chunk_size=1024):
+    bytes_buffer = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        bytes_buffer += chunk
+        a = bytes_buffer.find(b'\xff\xd8')
+        b = bytes_buffer.find(b'\xff\xd9')
+        if a != -1 and b != -1:
+            jpg = bytes_buffer[a:b+2]
+            bytes_buffer = bytes_buffer[b+2:]
+            yield jpg
+
+
+def fake_jpeg(rng, size):
+    # Random payload without 0xff bytes so it contains no stray markers
+    body = rng.integers(0, 0xff, size, dtype=np.uint8).tobytes()
+    return b'\xff\xd8' + body + b'\xff\xd9'
+
+
+def multipart_stream(frames, content_length):
+    parts = []
+    for jpg in frames:
+        header = b'--frame\r\nContent-Type: image/jpeg\r\n'
+        if content_length:
+            header += b'Content-Length: %d\r\n' % len(jpg)
+        parts.append(header + b'\r\n' + jpg + b'\r\n')
+    return b''.join(parts)
+
+
+def run(name, frames_iter, total_bytes):
+    start = time.perf_counter()
+    count = 0
+    for jpg in frames_iter:
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {count:5d} frames  {elapsed * 1000:9.1f} ms  "
+          f"{count / elapsed:9.0f} fps  {total_bytes / elapsed / 1e6:8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--frame-kb", type=int, default=120, help="approximate JPEG size (720p ~ 100-150 KB)")
+    parser.add_argument("--read-size", type=int, default=16384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [fake_jpeg(rng, args.frame_kb * 1024) for _ in range(args.frames)]
+    plain = multipart_stream(frames, content_length=False)
+    sized = multipart_stream(frames, content_length=True)
+
+    run("legacy (1 KB chunks)", legacy_frames(io.BytesIO(plain)), len(plain))
+    run("demuxer, 1 KB feed()",
+        MJPEGDemuxer("frame").iter_frames(iter(lambda s=io.BytesIO(plain): s.read(1024), b'')),
+        len(plain))
+    run(f"demuxer, readinto {args.read_size}",
+        MJPEGDemuxer("frame", read_size=args.read_size).iter_frames(io.BytesIO(plain)), len(plain))
+    run(f"demuxer, Content-Length {args.read_size}",
+        MJPEGDemuxer("frame", read_size=args.read_size).iter_frames(io.BytesIO(sized)), len(sized))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark: per-attribute posture checks vs PostureClassifier.classify_batch.
+
+Usage: python bench_posture_classifier.py [--frames 100000] [--profile webcam]
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from posture_classifier import (LEFT_EYE, LEFT_SHOULDER, NOSE, RIGHT_EYE, RIGHT_SHOULDER,
+                                LANDMARK_COUNT, LANDMARK_FIELDS, POSTURE_LABELS,
+                                PostureClassifier)
+
+
+# Per-attribute checks as they were copied into the detection scripts
+def legacy_is_tummy_sleeping(pose_landmarks, classifier):
+    nose = pose_landmarks.landmark[NOSE]
+    left_shoulder = pose_landmarks.landmark[LEFT_SHOULDER]
+    right_shoulder = pose_landmarks.landmark[RIGHT_SHOULDER]
+    if classifier.tummy_shoulder_dx is not None:
+        if abs(left_shoulder.x - right_shoulder.x) < classifier.tummy_shoulder_dx:
+            return True
+    if classifier.tummy_nose_dx is not None:
+        shoulder_mid_x = (left_shoulder.x + right_shoulder.x) / 2
+        is_face_down = abs(nose.x - shoulder_mid_x) < classifier.tummy_nose_dx
+        if is_face_down and nose.y > left_shoulder.y and nose.y > right_shoulder.y:
+            return True
+    return False
+
+
+def legacy_is_side_sleeping(pose_landmarks, classifier):
+    if classifier.side_eye_dx is None:
+        return False
+    left_eye = pose_landmarks.landmark[LEFT_EYE]
+    right_eye = pose_landmarks.landmark[RIGHT_EYE]
+    return abs(left_eye.x - right_eye.x) < classifier.side_eye_dx
+
+
+def legacy_classify(pose_landmarks, classifier):
+    if legacy_is_tummy_sleeping(pose_landmarks, classifier):
+        return "tummy"
+    if legacy_is_side_sleeping(pose_landmarks, classifier):
+        return "side"
+    return "normal"
+
+
+# Stand-in for the protobuf NormalizedLandmarkList returned by MediaPipe
+def to_landmark_list(frame):
+    return SimpleNamespace(landmark=[
+        SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=float(v))
+        for x, y, z, v in frame
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100000)
+    parser.add_argument("--profile", default="webcam")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frames = rng.random((args.frames, LANDMARK_COUNT, LANDMARK_FIELDS), dtype=np.float32)
+    landmark_lists = [to_landmark_list(frame) for frame in frames]
+    classifier = PostureClassifier(args.profile)
+
+    start = time.perf_counter()
+    legacy_labels = [legacy_classify(lms, classifier) for lms in landmark_lists]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    codes = classifier.classify_batch(frames)
+    batch_time = time.perf_counter() - start
+
+    batch_labels = classifier.labels(codes)
+    mismatches = sum(a != b for a, b in zip(legacy_labels, batch_labels))
+    counts = {label: int(np.count_nonzero(codes == i)) for i, label in enumerate(POSTURE_LABELS)}
+
+    print(f"profile={args.profile} frames={args.frames} labels={counts}")
+    print(f"per-attribute: {legacy_time * 1000:9.2f} ms  ({args.frames / legacy_time:12.0f} frames/s)")
+    print(f"batch:         {batch_time * 1000:9.2f} ms  ({args.frames / batch_time:12.0f} frames/s)")
+    print(f"speed-up: {legacy_time / batch_time:.1f}x  mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
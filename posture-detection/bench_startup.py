@@ -0,0 +1,87 @@
+"""
+Benchmark cold start of the detection services.
+
+Launches the Flask or FastAPI service in a fresh process, polls /ready until
+it answers 200 and reports the wall time to ready along with the service's
+own import, init and first-inference times. Repeat with --runs to smooth
+out disk cache effects; --json writes every run for tracking regressions.
+
+Usage: python bench_startup.py {flask,fastapi} [--runs 3] [--port PORT] [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# service -> (command, working directory, default port); the port is also passed as $PORT
+SERVICES = {
+    "flask": ([sys.executable, "flask_api_detection.py"], HERE, 5002),
+    "fastapi": ([sys.executable, "-m", "uvicorn", "main:app", "--port", "{port}"],
+                os.path.join(HERE, "..", "fast-api"), 8000),
+}
+PHASES = ("import_s", "init_s", "first_inference_s")
+
+
+def measure_startup(service, port, timeout=120.0):
+    """Start `service` once; returns the seconds until /ready and its startup report."""
+    command, cwd, _ = SERVICES[service]
+    command = [part.format(port=port) for part in command]
+    url = f"http://127.0.0.1:{port}/ready"
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, env=dict(os.environ, PORT=str(port)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"{service} exited with status {process.returncode}")
+            try:
+                response = requests.get(url, timeout=1.0)
+                if response.status_code == 200:
+                    return time.perf_counter() - start, response.json()["startup"]
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.05)
+        raise TimeoutError(f"{service} not ready after {timeout:.0f} s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("service", choices=list(SERVICES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, help="port the service listens on")
+    parser.add_argument("--json", help="also write every run to this file")
+    args = parser.parse_args()
+
+    port = args.port or SERVICES[args.service][2]
+    runs = []
+    for _ in range(args.runs):
+        ready_s, startup = measure_startup(args.service, port)
+        runs.append(dict(startup, ready_s=ready_s))
+
+    print(f"{args.service}, {args.runs} run(s)")
+    print(f"{'phase':<18} {'median s':>9} {'min s':>9} {'max s':>9}")
+    for phase in PHASES + ("ready_s",):
+        values = np.array([run[phase] for run in runs])
+        print(f"{phase:<18} {np.median(values):9.3f} {values.min():9.3f} {values.max():9.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"service": args.service, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
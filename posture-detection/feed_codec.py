@@ -0,0 +1,88 @@
+import numpy as np
+
+from stage_timer import NULL_TIMER
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 scale, skipping most of the IDCT work
+# (cv2 imread flag names; cv2 is imported on first use so importing the services stays fast)
+REDUCED_DECODE = {
+    1: "IMREAD_COLOR",
+    2: "IMREAD_REDUCED_COLOR_2",
+    4: "IMREAD_REDUCED_COLOR_4",
+    8: "IMREAD_REDUCED_COLOR_8",
+}
+
+
+def decode_reduced(jpg, reduction):
+    """Decode a JPEG at 1/`reduction` scale; None if it cannot be decoded."""
+    import cv2
+
+    return cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), getattr(cv2, REDUCED_DECODE[reduction]))
+
+
+class FeedCodec:
+    """
+    Decode and re-encode for the processed MJPEG feed, with separate
+    resolutions for pose and for viewers.
+
+    `decode_for_inference` decodes the upstream JPEG at 1/`inference_reduction`
+    scale for pose. `render` produces the JPEG sent to viewers: the original
+    upstream bytes untouched when there is nothing to draw (and no resize is
+    needed), otherwise a frame decoded at the smallest scale that still
+    covers `max_side`, annotated and encoded at `quality`.
+    """
+
+    def __init__(self, inference_reduction=2, quality=80, max_side=None, passthrough=True, timer=NULL_TIMER):
+        if inference_reduction not in REDUCED_DECODE:
+            raise ValueError(f"inference_reduction must be one of {sorted(REDUCED_DECODE)}")
+        self.inference_reduction = inference_reduction
+        self.quality = quality
+        self.max_side = max_side
+        self.passthrough = passthrough
+        self.timer = timer
+        self.passed_through = 0
+        self.encoded = 0
+
+    def decode_for_inference(self, jpg):
+        with self.timer.stage("decode"):
+            return decode_reduced(jpg, self.inference_reduction)
+
+    def _view_reduction(self, full_side):
+        if self.max_side is None:
+            return 1
+        # Largest decode reduction whose output is still at least max_side
+        return max(factor for factor in REDUCED_DECODE if factor == 1 or full_side / factor >= self.max_side)
+
+    def render(self, jpg, small, draw=None):
+        """
+        Return the viewer JPEG for upstream frame `jpg`. `small` is the
+        inference-scale decode of it; `draw(frame)` annotates a BGR frame in
+        place, or is None when there is no overlay.
+        """
+        full_side = max(small.shape[:2]) * self.inference_reduction
+        fits = self.max_side is None or full_side <= self.max_side
+        if draw is None and self.passthrough and fits:
+            self.passed_through += 1
+            return bytes(jpg)
+
+        import cv2
+
+        reduction = self._view_reduction(full_side)
+        if reduction == self.inference_reduction:
+            # Pose only reads the inference frame, so draw on it directly
+            frame = small
+        else:
+            with self.timer.stage("decode"):
+                frame = decode_reduced(jpg, reduction)
+
+        with self.timer.stage("draw"):
+            side = max(frame.shape[:2])
+            if self.max_side is not None and side > self.max_side:
+                scale = self.max_side / side
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            if draw is not None:
+                draw(frame)
+
+        with self.timer.stage("encode"):
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        self.encoded += 1
+        return buffer.tobytes()
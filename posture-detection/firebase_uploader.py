@@ -0,0 +1,141 @@
+import threading
+import time
+
+from backoff import retry
+
+
+class FirebaseBackend:
+    """Uploads to Firebase Storage and the Realtime Database (app must already be initialised)."""
+
+    def __init__(self, db_path="baby_monitoring"):
+        from firebase_admin import db, storage
+
+        self._bucket = storage.bucket()
+        self._ref = db.reference(db_path)
+
+    def upload_image(self, name, jpeg_bytes):
+        blob = self._bucket.blob(name)
+        blob.upload_from_string(jpeg_bytes, content_type="image/jpeg")
+        return blob.public_url
+
+    def update_status(self, status):
+        self._ref.update(status)
+
+
+class StatusUploader:
+    """
+    Background upload pipeline for the monitoring loop.
+
+    submit() never blocks on the network. Nothing is queued unless the posture
+    state changes, and the image is only encoded then. Pending status updates and images are
+    both coalesced: every image goes to the same blob, so only the latest is
+    uploaded (before the status that points at it). Failed calls are retried
+    with exponential backoff.
+    """
+
+    def __init__(self, backend, max_retries=5, backoff=0.5, max_backoff=30.0, image_name="test123.jpg"):
+        self.backend = backend
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.image_name = image_name
+        self._image = None
+        self._status = None
+        self._last_state = None
+        self._image_url = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._busy = False
+        self.stats = {"statuses_sent": 0, "statuses_coalesced": 0, "images_sent": 0,
+                      "images_coalesced": 0, "retries": 0, "failures": 0}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, status, encode_image=None):
+        """
+        Queue a status update and its image. Nothing is sent if the status is
+        the same as the previous one. `encode_image()` returns the JPEG bytes;
+        it is only called when the status changed, on the caller's thread.
+        Returns True if the status was queued.
+        """
+        state = tuple(sorted(status.items()))
+        with self._cond:
+            if state == self._last_state:
+                # The backend already has (or is about to get) this state
+                return False
+            self._last_state = state
+        jpeg_bytes = encode_image() if encode_image is not None else None
+        with self._cond:
+            if jpeg_bytes is not None:
+                if self._image is not None:
+                    # Would be overwritten straight away; don't spend the uplink on it
+                    self.stats["images_coalesced"] += 1
+                self._image = jpeg_bytes
+            if self._status is not None:
+                self.stats["statuses_coalesced"] += 1
+            self._status = dict(status)
+            self._cond.notify()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything submitted so far has been sent (or given up on)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._image is not None or self._status is not None or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _retry(self, fn, *args):
+        try:
+            return retry(fn, *args, retries=self.max_retries, backoff=self.backoff, max_backoff=self.max_backoff,
+                         on_retry=self._on_retry, give_up=lambda: self._closed)
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"Upload failed, giving up: {e}")
+            raise
+
+    def _on_retry(self, error):
+        self.stats["retries"] += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._image is None and self._status is None and not self._closed:
+                    self._cond.wait()
+                if self._closed and self._image is None and self._status is None:
+                    return
+                jpeg_bytes, self._image = self._image, None
+                # Send the status only once the image queued with it is up
+                status = None
+                if jpeg_bytes is None:
+                    status, self._status = self._status, None
+                self._busy = True
+
+            try:
+                if jpeg_bytes is not None:
+                    self._image_url = self._retry(self.backend.upload_image, self.image_name, jpeg_bytes)
+                    self.stats["images_sent"] += 1
+                if status is not None:
+                    if self._image_url is not None:
+                        status["image_url"] = self._image_url
+                    self._retry(self.backend.update_status, status)
+                    self.stats["statuses_sent"] += 1
+            except Exception:
+                with self._cond:
+                    # Keep the failed status for the next attempt unless a newer one arrived
+                    if status is not None and self._status is None and not self._closed:
+                        self._status = status
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
@@ -1,107 +1,271 @@
-import cv2
-import mediapipe as mp
-from flask import Flask, Response, jsonify, request
-import requests
+import time
+# Import time is reported by /ready; measured from before the heavy imports
+IMPORT_STARTED = time.perf_counter()
+import functools
+import os
 import numpy as np
+from flask import Flask, Response, jsonify, request
+from posture_classifier import PostureClassifier
+from stream_registry import CameraStream, InferencePool, StreamRegistry
+from motion_gate import MotionGate
+from roi_tracker import RoiTracker
+from inference_profiles import create_pose, load_profile
+from stage_timer import StageTimer
+from metrics import CONTENT_TYPE, Registry
+from feed_codec import FeedCodec
+from notification_dispatcher import ConsoleTransport, NotificationDispatcher, WebhookTransport
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Mediapipe initialization
-mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
-
-# Initialize Mediapipe pose object
-pose = mp_pose.Pose()
+# Pose settings for this device; override with INFERENCE_PROFILE
+profile_name, profile = load_profile("desktop")
+print(f"Inference profile: {profile_name}")
 
-# URL of the Raspberry Pi video feed
+# URL of the Raspberry Pi video feed, registered as the "default" stream at startup
 RASPBERRY_PI_VIDEO_URL = "http://192.168.99.120:5000/video_feed"
+DEFAULT_STREAM = "default"
+# Bytes read from the upstream feed per socket read
+STREAM_READ_SIZE = 16384
+# Frames buffered per viewer before the oldest is dropped
+VIEWER_QUEUE_SIZE = 2
+# Pose runs on upstream frames decoded at 1/INFERENCE_REDUCTION scale (1, 2, 4 or 8)
+INFERENCE_REDUCTION = 2
+# JPEG quality and longest side in pixels of the viewer feed (None keeps the upstream size)
+OUTPUT_JPEG_QUALITY = 80
+OUTPUT_MAX_SIDE = None
+# Where notifications go: recipient name -> transport. Add e.g. WebhookTransport for push/SMS.
+NOTIFICATION_RECIPIENTS = {"console": ConsoleTransport()}
+if os.environ.get("NOTIFY_WEBHOOK_URL"):
+    NOTIFICATION_RECIPIENTS["webhook"] = WebhookTransport(os.environ["NOTIFY_WEBHOOK_URL"])
+# Pose workers shared by all streams, and how they pick the next stream
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 2))
+SCHEDULING_POLICY = os.environ.get("SCHEDULING_POLICY", "round_robin")
+# Latency budget per frame, used by the "deadline" policy
+FRAME_BUDGET = 0.5
+# Port the app listens on when run directly
+PORT = int(os.environ.get("PORT", 5002))
+
+# Posture checks shared with the other detection scripts
+classifier = PostureClassifier("webcam")
+
+# Run pose on a crop around the baby; set a crib rectangle (x0, y0, x1, y1) in upstream pixels to limit it
+# (per stream: pass "crib_rect" to POST /streams)
+CRIB_RECT = None
+
+# Overlay text per posture, also used as the notification message
+OVERLAYS = {
+    "tummy": ('Alert: Baby is sleeping on tummy!', (50, 50), (0, 0, 255)),
+    "side": ('Alert: Baby is sleeping on side!', (50, 100), (0, 0, 255)),
+    "normal": ('Normal: Baby is in a safe position.', (50, 150), (0, 255, 0)),
+}
+
+# Prometheus metrics served on /metrics
+metrics = Registry()
+stage_seconds = metrics.histogram("feed_stage_seconds", "Feed latency per stage (decode, pose, encode, ...)",
+                                  labels=("stage",))
+frames_total = metrics.counter("feed_frames_total", "Frames processed", labels=("stream",))
+postures_total = metrics.counter("feed_postures_total", "Processed frames per posture label",
+                                 labels=("stream", "posture"))
+notifications_total = metrics.counter("notifications_total", "Notifications queued", labels=("posture",))
+
+# Per-stage latency over all streams, printed every minute and exported as stage_seconds
+timer = StageTimer(report_interval=60.0, histogram=stage_seconds)
+
+# Reduced-scale decode for pose, re-encode (or passthrough) for viewers
+feed_codec = FeedCodec(inference_reduction=INFERENCE_REDUCTION, quality=OUTPUT_JPEG_QUALITY,
+                       max_side=OUTPUT_MAX_SIDE, timer=timer)
+
+
+def create_worker_pose():
+    # A worker sees frames from every stream in turn, so MediaPipe's own
+    # frame-to-frame tracking would mix cameras; each stream's RoiTracker tracks instead
+    return create_pose(dict(profile, static_image_mode=True, smooth_landmarks=False))
+
 
-# To store the notification state
-notification_sent = {"tummy": False, "side": False, "normal": False}
-
-# Function to check for tummy sleeping
-def is_tummy_sleeping(pose_landmarks):
-    left_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER]
-    right_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_SHOULDER]
-    return abs(left_shoulder.x - right_shoulder.x) < 0.3
-
-# Function to check for side sleeping
-def is_side_sleeping(pose_landmarks):
-    left_eye = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_EYE]
-    right_eye = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_EYE]
-    return abs(left_eye.x - right_eye.x) < 0.07
-
-# Function to process the frames and overlay posture detection results
-def generate_frames():
-    global notification_sent
-    stream = requests.get(RASPBERRY_PI_VIDEO_URL, stream=True)
-    if stream.status_code != 200:
-        print("Error: Unable to access video feed.")
+def warm_up_pose(pose):
+    # The first process() call initialises the graph; pay it at startup, not on a camera frame
+    pose.process(np.zeros((profile["max_side"], profile["max_side"], 3), dtype=np.uint8))
+
+
+# Sends notifications on its own thread so a slow provider never stalls the video
+notifier = NotificationDispatcher(NOTIFICATION_RECIPIENTS, coalesce_window=2.0, rate_per_minute=6.0, burst=3)
+
+# Bounded pool of pose workers shared by every stream
+# Each worker builds and warms its Pose graph on its own thread, so importing the app stays fast
+inference_pool = InferencePool(create_worker_pose, workers=INFERENCE_WORKERS, policy=SCHEDULING_POLICY,
+                               warmup=warm_up_pose)
+
+
+# Function to process one frame and overlay posture detection results.
+# Runs on an inference worker; frames of one stream are never processed concurrently.
+def process_frame(stream, pose, jpg, small):
+    # Reuse the last result unless the scene changed
+    if stream.motion_gate.should_infer(small) or stream.results is None:
+        # Crop, downscale and convert to RGB, then map landmarks back to the full frame
+        stream.results = stream.roi_tracker.process(pose, small, timer=timer)
+
+    draw = None
+    if stream.results.pose_landmarks:
+        with timer.stage("classify"):
+            posture = classifier.classify(stream.results.pose_landmarks)
+        stream.posture = posture
+        postures_total.inc(stream.id, posture)
+
+        # Notify once per change of posture, per stream; sent from the dispatcher thread
+        if notifier.notify(stream.id, posture, OVERLAYS[posture][0]):
+            notifications_total.inc(posture)
+
+        draw = functools.partial(draw_overlay, pose_landmarks=stream.results.pose_landmarks, posture=posture)
+
+    timer.frame_done()
+    frames_total.inc(stream.id)
+
+    # Pose keeps running for alerts, but nobody is watching: skip drawing and encoding
+    if stream.hub.subscriber_count == 0:
         return
 
-    bytes_buffer = b''
-    for chunk in stream.iter_content(chunk_size=1024):
-        bytes_buffer += chunk
-        a = bytes_buffer.find(b'\xff\xd8')  # JPEG start
-        b = bytes_buffer.find(b'\xff\xd9')  # JPEG end
-        if a != -1 and b != -1:
-            # Extract JPEG image
-            jpg = bytes_buffer[a:b+2]
-            bytes_buffer = bytes_buffer[b+2:]
-
-            # Decode image
-            frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
-
-            # Convert the frame to RGB
-            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(image_rgb)
-
-            if results.pose_landmarks:
-                # Draw pose landmarks on the frame
-                mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-
-                # Check and overlay warnings
-                if is_tummy_sleeping(results.pose_landmarks):
-                    cv2.putText(frame, 'Alert: Baby is sleeping on tummy!', (50, 50),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-                    if not notification_sent["tummy"]:
-                        send_notification("Alert: Baby is sleeping on tummy!")
-                        notification_sent = {"tummy": True, "side": False, "normal": False}
-                elif is_side_sleeping(results.pose_landmarks):
-                    cv2.putText(frame, 'Alert: Baby is sleeping on side!', (50, 100),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-                    if not notification_sent["side"]:
-                        send_notification("Alert: Baby is sleeping on side!")
-                        notification_sent = {"tummy": False, "side": True, "normal": False}
-                else:
-                    # Normal position
-                    cv2.putText(frame, 'Normal: Baby is in a safe position.', (50, 150),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-                    if not notification_sent["normal"]:
-                        send_notification("Normal: Baby is in a safe position.")
-                        notification_sent = {"tummy": False, "side": False, "normal": True}
-
-            # Encode the processed frame to JPEG
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
-
-            # Yield the processed frame
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    # Encode the processed frame to JPEG, or pass the upstream JPEG through if nothing is drawn
+    frame = feed_codec.render(jpg, small, draw)
+
+    # Send the processed frame to the stream's viewers
+    stream.hub.publish(b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+
+def draw_overlay(frame, pose_landmarks, posture):
+    # mediapipe is only loaded by the pose workers' first create_pose, never at import
+    import cv2
+    import mediapipe as mp
+
+    # Draw pose landmarks on the frame
+    mp.solutions.drawing_utils.draw_landmarks(frame, pose_landmarks, mp.solutions.pose.POSE_CONNECTIONS)
+
+    # Overlay the warning or the all-clear
+    text, origin, color = OVERLAYS[posture]
+    cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2, cv2.LINE_AA)
 
 def send_notification(message):
     """
-    This function simulates sending a notification.
-    Replace with your own notification logic (e.g., push notifications, email, SMS).
+    Queue a manual notification to every recipient (no dedup, still rate limited).
     """
-    print(f"Notification sent: {message}")
-    # Example: Integrate with an API like Twilio, Firebase, or custom backend for real notifications.
+    notifications_total.inc("manual")
+    notifier.notify(None, "manual", message, force=True)
+
+def create_stream(stream_id, url, crib_rect=CRIB_RECT):
+    if crib_rect is not None:
+        # The tracker works on the reduced-scale inference frame
+        crib_rect = tuple(v // INFERENCE_REDUCTION for v in crib_rect)
+    return CameraStream(stream_id, url, inference_pool, process_frame, feed_codec.decode_for_inference,
+                        # Skip pose inference while the crib scene is still
+                        motion_gate=MotionGate(max_interval=10.0),
+                        roi_tracker=RoiTracker(crib_rect=crib_rect, max_side=profile["max_side"]),
+                        budget=FRAME_BUDGET, read_size=STREAM_READ_SIZE, queue_size=VIEWER_QUEUE_SIZE)
+
+# Upstream feeds being watched; each has its own ingest thread and viewer hub
+registry = StreamRegistry(create_stream)
+
+# Summed over streams at scrape time, so they cost nothing per frame
+metrics.gauge("feed_streams", "Registered upstream streams", func=lambda: len(registry))
+metrics.gauge("feed_subscribers", "Connected processed-feed viewers",
+              func=lambda: sum(stream.hub.subscriber_count for stream in registry))
+metrics.gauge("feed_queue_depth", "Frames waiting in viewer queues",
+              func=lambda: sum(stream.hub.queue_depth for stream in registry))
+metrics.gauge("inference_pending_frames", "Streams with a frame waiting for a pose worker",
+              func=lambda: inference_pool.pending)
+metrics.counter("inference_dropped_frames_total", "Frames replaced by a newer one before a worker was free",
+                func=lambda: inference_pool.dropped)
+metrics.counter("feed_dropped_frames_total", "Frames dropped for slow viewers",
+                func=lambda: sum(stream.hub.dropped for stream in registry))
+metrics.counter("feed_upstream_reconnects_total", "Reconnects to upstream feeds",
+                func=lambda: sum(stream.reconnects for stream in registry))
+metrics.counter("notifications_sent_total", "Notifications delivered, summed over recipients",
+                func=lambda: notifier.stats["sent"])
+metrics.counter("notifications_coalesced_total", "Notifications replaced by a newer state within the window",
+                func=lambda: notifier.stats["coalesced"])
+metrics.counter("notification_failures_total", "Notifications given up on after retries",
+                func=lambda: notifier.stats["failures"])
+metrics.counter("feed_inferences_skipped_total", "Frames that reused the last pose result (no motion)",
+                func=lambda: sum(stream.motion_gate.skipped for stream in registry))
+
+def stream_response(stream):
+    return Response(stream.hub.frames(),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/processed_feed')
 def processed_feed():
-    return Response(generate_frames(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+    stream = registry.get(DEFAULT_STREAM)
+    if stream is None:
+        return jsonify({"status": "error", "message": "No default stream."}), 404
+    return stream_response(stream)
+
+@app.route('/streams', methods=['GET'])
+def list_streams():
+    return jsonify({"streams": [stream.describe() for stream in registry]}), 200
+
+def parse_crib_rect(value):
+    """A crib rectangle from a request: 4 integers (x0, y0, x1, y1) with x1 > x0 and y1 > y0."""
+    if (not isinstance(value, (list, tuple)) or len(value) != 4
+            or not all(isinstance(v, int) and not isinstance(v, bool) and v >= 0 for v in value)):
+        raise ValueError("'crib_rect' must be 4 non-negative integers [x0, y0, x1, y1].")
+    x0, y0, x1, y1 = value
+    # The tracker works on the reduced-scale frame, so the rectangle must survive the reduction
+    r = INFERENCE_REDUCTION
+    if x1 // r <= x0 // r or y1 // r <= y0 // r:
+        raise ValueError(f"'crib_rect' must have x1 > x0 and y1 > y0, at least {r} pixels apart.")
+    return tuple(value)
+
+@app.route('/streams', methods=['POST'])
+def add_stream():
+    """
+    Start watching another camera: {"id": "nursery", "url": "http://.../video_feed", "crib_rect": [x0, y0, x1, y1]}
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get("id") or not isinstance(data.get("url"), str):
+        return jsonify({"status": "error", "message": "Missing 'id' or 'url' in request."}), 400
+    crib_rect = None
+    if data.get("crib_rect") is not None:
+        try:
+            crib_rect = parse_crib_rect(data["crib_rect"])
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+    stream = registry.add(str(data["id"]), data["url"], crib_rect=crib_rect)
+    if stream is None:
+        return jsonify({"status": "error", "message": f"Stream '{data['id']}' already exists."}), 409
+    return jsonify({"status": "success", "stream": stream.describe()}), 201
+
+@app.route('/streams/<stream_id>', methods=['DELETE'])
+def remove_stream(stream_id):
+    if not registry.remove(stream_id):
+        return jsonify({"status": "error", "message": f"No stream '{stream_id}'."}), 404
+    return jsonify({"status": "success", "message": f"Stream '{stream_id}' removed."}), 200
+
+@app.route('/streams/<stream_id>/processed_feed')
+def stream_feed(stream_id):
+    stream = registry.get(stream_id)
+    if stream is None:
+        return jsonify({"status": "error", "message": f"No stream '{stream_id}'."}), 404
+    return stream_response(stream)
+
+def startup_report():
+    """Seconds spent importing the app, building the Pose graphs and on their first inference."""
+    return {"import_s": IMPORT_SECONDS,
+            "init_s": max(timing["init_s"] for timing in inference_pool.startup),
+            "first_inference_s": max(timing["first_inference_s"] for timing in inference_pool.startup)}
+
+@app.route('/ready')
+def ready():
+    """
+    Readiness probe: 503 until every pose worker has been built and warmed up.
+    """
+    if inference_pool.startup_error is not None:
+        return jsonify({"status": "failed", "error": str(inference_pool.startup_error)}), 503
+    if not inference_pool.ready:
+        return jsonify({"status": "starting"}), 503
+    return jsonify({"status": "ready", "startup": startup_report()}), 200
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
 
 @app.route('/send_notification', methods=['POST'])
 def api_send_notification():
@@ -114,5 +278,10 @@ def api_send_notification():
         return jsonify({"status": "success", "message": "Notification sent."}), 200
     return jsonify({"status": "error", "message": "Missing 'message' in request."}), 400
 
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+print(f"Imported in {IMPORT_SECONDS:.2f} s")
+inference_pool.start()
+registry.add(DEFAULT_STREAM, RASPBERRY_PI_VIDEO_URL)
+
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5002, threaded=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=PORT, threaded=True)
@@ -0,0 +1,109 @@
+import threading
+from collections import deque
+
+
+class Subscriber:
+    """
+    Bounded per-client frame queue. When full, the oldest frame is dropped so
+    a slow client only ever falls behind itself.
+    """
+
+    def __init__(self, maxsize=2):
+        self._frames = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, data):
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(data)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the next frame, or None once the subscriber is closed."""
+        with self._cond:
+            while not self._frames and not self.closed:
+                if not self._cond.wait(timeout):
+                    return None
+            return self._frames.popleft() if self._frames else None
+
+    def __len__(self):
+        return len(self._frames)
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class FrameHub:
+    """
+    Fans frames out to any number of viewers.
+
+    The producer (e.g. a stream's inference job) pushes each encoded frame
+    with `publish`; every viewer has its own bounded Subscriber queue, so a
+    slow viewer drops its own oldest frames without holding up the others.
+    """
+
+    def __init__(self, queue_size=2):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._dropped_closed = 0
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    @property
+    def queue_depth(self):
+        """Frames waiting in viewer queues, summed over viewers."""
+        with self._lock:
+            return sum(len(subscriber) for subscriber in self._subscribers)
+
+    @property
+    def dropped(self):
+        """Frames dropped for slow viewers since the hub was created."""
+        with self._lock:
+            return self._dropped_closed + sum(subscriber.dropped for subscriber in self._subscribers)
+
+    def subscribe(self):
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.discard(subscriber)
+                self._dropped_closed += subscriber.dropped
+        subscriber.close()
+
+    def frames(self):
+        """Generator for one viewer; suitable as a Flask streaming Response body."""
+        subscriber = self.subscribe()
+        try:
+            while True:
+                data = subscriber.get()
+                if data is None:
+                    return
+                yield data
+        finally:
+            self.unsubscribe(subscriber)
+
+    def publish(self, data):
+        """Send one frame to every current subscriber."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(data)
+
+    def close(self):
+        """Disconnect every subscriber, ending their frames() generators."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            self.unsubscribe(subscriber)
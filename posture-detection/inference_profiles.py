@@ -0,0 +1,89 @@
+import os
+
+# Named MediaPipe Pose settings per deployment. The first five keys are
+# passed to mp_pose.Pose(); max_side is the longest side (pixels) of the image
+# handed to the model, see RoiTracker.
+INFERENCE_PROFILES = {
+    # Raspberry Pi Zero 2: lightest model, small input
+    "pi-zero": {
+        "static_image_mode": False,
+        "model_complexity": 0,
+        "smooth_landmarks": True,
+        "min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+        "max_side": 256,
+    },
+    # Raspberry Pi 4 running pi_baby_movement.py
+    "pi4": {
+        "static_image_mode": False,
+        "model_complexity": 0,
+        "smooth_landmarks": True,
+        "min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+        "max_side": 320,
+    },
+    # Laptop/desktop webcam scripts and the Flask processed feed
+    "desktop": {
+        "static_image_mode": False,
+        "model_complexity": 1,
+        "smooth_landmarks": True,
+        "min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+        "max_side": 480,
+    },
+    # Snapshot loops: frames are a second or more apart, so no tracking
+    "snapshot": {
+        "static_image_mode": True,
+        "model_complexity": 1,
+        "smooth_landmarks": False,
+        "min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+        "max_side": 480,
+    },
+    # Hosted FastAPI service: unrelated frames from many Pis, so no tracking
+    "server": {
+        "static_image_mode": True,
+        "model_complexity": 1,
+        "smooth_landmarks": False,
+        "min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+        "max_side": 640,
+    },
+    # Heaviest model at high resolution; the accuracy reference for benchmarks
+    "accurate": {
+        "static_image_mode": False,
+        "model_complexity": 2,
+        "smooth_landmarks": True,
+        "min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+        "max_side": 960,
+    },
+}
+
+POSE_OPTIONS = ("static_image_mode", "model_complexity", "smooth_landmarks",
+                "min_detection_confidence", "min_tracking_confidence")
+
+
+def load_profile(default):
+    """
+    Return (name, settings) for the profile named by the INFERENCE_PROFILE
+    environment variable, or `default` if it is not set.
+    """
+    name = os.environ.get("INFERENCE_PROFILE", default)
+    if name not in INFERENCE_PROFILES:
+        raise ValueError(f"Unknown inference profile: {name} (choose from {', '.join(INFERENCE_PROFILES)})")
+    return name, dict(INFERENCE_PROFILES[name])
+
+
+def create_pose(profile):
+    """Build a MediaPipe Pose object from a profile's settings."""
+    import mediapipe as mp
+
+    return mp.solutions.pose.Pose(**{key: profile[key] for key in POSE_OPTIONS})
+
+
+def heaviest_profile(names=None):
+    """The profile used as the accuracy reference: largest model, then largest input."""
+    names = names or list(INFERENCE_PROFILES)
+    return max(names, key=lambda name: (INFERENCE_PROFILES[name]["model_complexity"],
+                                        INFERENCE_PROFILES[name]["max_side"]))
@@ -0,0 +1,248 @@
+import os
+import re
+
+import numpy as np
+
+from posture_classifier import LANDMARK_COUNT, LANDMARK_FIELDS, POSTURE_LABELS, results_to_array
+
+# Column files of one chunk: (suffix, dtype, values per row)
+COLUMNS = (
+    ("timestamps", np.float64, 1),
+    ("landmarks", np.float32, LANDMARK_COUNT * LANDMARK_FIELDS),
+    ("labels", np.int8, 1),
+)
+ROW_BYTES = sum(np.dtype(dtype).itemsize * width for _, dtype, width in COLUMNS)
+_CHUNK_NAME = re.compile(r"^chunk-(\d{6})\.timestamps$")
+
+
+class LandmarkStore:
+    """
+    Append-only on-disk log of pose landmarks.
+
+    Rows (unix timestamp, (33, 4) float32 landmarks, int8 posture code) are
+    written column-wise into chunks of `chunk_rows` rows: one raw file per
+    column, so a chunk costs ROW_BYTES (537) bytes per frame and the store
+    never exceeds `max_chunks` chunks; the oldest chunk is deleted first.
+    Appends are buffered and written every `flush_rows` rows. Frames without
+    a pose are stored as NaN landmarks.
+
+    Reads memory-map the chunk files, so a time-range query only touches
+    the rows it returns. Rows must arrive in timestamp order; a row older
+    than the last one (the wall clock stepped back) is dropped and counted
+    in `dropped`.
+
+    Only one process may open the store as the writer. Others (reports)
+    pass `writer=False`: they never append, truncate or delete files, and
+    see the rows every column already holds, so a flush in progress is
+    simply not visible yet. reclassify(write=True) still rewrites the
+    labels of stored rows in place.
+    """
+
+    def __init__(self, path, chunk_rows=3600, max_chunks=24 * 14, flush_rows=60, writer=True):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.max_chunks = max_chunks
+        self.flush_rows = flush_rows
+        self.writer = writer
+        self.dropped = 0
+        self._dropping = 0
+        if writer:
+            os.makedirs(path, exist_ok=True)
+        self._chunks = self._scan()
+        self._buffer = {name: np.empty((flush_rows, width), dtype=dtype) for name, dtype, width in COLUMNS}
+        self._buffered = 0
+        self._last_timestamp = None
+        last = self._chunks[-1] if self._chunks else None
+        if last is not None and self._rows(last):
+            self._last_timestamp = float(self._open(last, "timestamps")[-1, 0])
+
+    # Chunk files
+
+    def _file(self, chunk, column):
+        return os.path.join(self.path, f"chunk-{chunk:06d}.{column}")
+
+    def _scan(self):
+        chunks = sorted(int(m.group(1)) for m in map(_CHUNK_NAME.match, os.listdir(self.path)) if m)
+        if chunks and self.writer:
+            self._repair(chunks[-1])
+        return chunks
+
+    def _rows(self, chunk):
+        rows = None
+        for name, dtype, width in COLUMNS:
+            try:
+                size = os.path.getsize(self._file(chunk, name))
+            except FileNotFoundError:
+                return 0
+            count = size // (np.dtype(dtype).itemsize * width)
+            rows = count if rows is None else min(rows, count)
+        return rows
+
+    def _repair(self, chunk):
+        """Cut every column of the last chunk to its shortest one (a write interrupted by power loss)."""
+        rows = self._rows(chunk)
+        for name, dtype, width in COLUMNS:
+            file_path = self._file(chunk, name)
+            if os.path.exists(file_path):
+                with open(file_path, "r+b") as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize * width)
+
+    def _open(self, chunk, column, mode="r"):
+        dtype, width = next((dtype, width) for name, dtype, width in COLUMNS if name == column)
+        rows = self._rows(chunk)
+        if rows == 0:
+            return np.empty((0, width), dtype=dtype)
+        return np.memmap(self._file(chunk, column), dtype=dtype, mode=mode, shape=(rows, width))
+
+    # Writing
+
+    def append(self, timestamp, landmarks, label):
+        """
+        Add one frame: landmarks as a (33, 4) array (NaN for no pose) and a
+        posture code. Returns False if the row was dropped as out of order.
+        """
+        if not self.writer:
+            raise ValueError("Store was opened with writer=False")
+        if self._last_timestamp is not None and timestamp < self._last_timestamp:
+            if not self._dropping:
+                print(f"Landmark store: clock went back ({timestamp:.0f} < {self._last_timestamp:.0f}), "
+                      "dropping rows until it catches up")
+            self._dropping += 1
+            self.dropped += 1
+            return False
+        if self._dropping:
+            print(f"Landmark store: clock caught up, {self._dropping} row(s) dropped")
+            self._dropping = 0
+        self._last_timestamp = timestamp
+        i = self._buffered
+        self._buffer["timestamps"][i, 0] = timestamp
+        self._buffer["landmarks"][i] = np.asarray(landmarks, dtype=np.float32).reshape(-1)
+        self._buffer["labels"][i, 0] = label
+        self._buffered += 1
+        if self._buffered == self.flush_rows:
+            self.flush()
+        return True
+
+    def append_results(self, timestamp, results, classifier):
+        """Classify a `pose.process` result and append it; returns the posture label."""
+        landmarks = results_to_array(results)
+        code = int(classifier.classify_batch(landmarks)[0])
+        self.append(timestamp, landmarks, code)
+        return POSTURE_LABELS[code]
+
+    def flush(self):
+        start = 0
+        while start < self._buffered:
+            if not self._chunks or self._rows(self._chunks[-1]) >= self.chunk_rows:
+                self._new_chunk()
+            chunk = self._chunks[-1]
+            count = min(self._buffered - start, self.chunk_rows - self._rows(chunk))
+            for name, _, _ in COLUMNS:
+                with open(self._file(chunk, name), "ab") as f:
+                    f.write(self._buffer[name][start:start + count].tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            start += count
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _new_chunk(self):
+        self._chunks.append(self._chunks[-1] + 1 if self._chunks else 0)
+        while len(self._chunks) > self.max_chunks:
+            oldest = self._chunks.pop(0)
+            for name, _, _ in COLUMNS:
+                try:
+                    os.remove(self._file(oldest, name))
+                except FileNotFoundError:
+                    pass
+
+    # Reading
+
+    def __len__(self):
+        return sum(self._rows(chunk) for chunk in self._chunks) + self._buffered
+
+    def disk_bytes(self):
+        return sum(self._rows(chunk) for chunk in self._chunks) * ROW_BYTES
+
+    def query(self, start=None, end=None):
+        """
+        Rows with start <= timestamp < end (either bound may be None), as
+        (timestamps (N,), landmarks (N, 33, 4), labels (N,)). Rows still in the
+        write buffer are included.
+        """
+        timestamps, landmarks, labels = [], [], []
+        for chunk in self._chunks:
+            ts = self._open(chunk, "timestamps")[:, 0]
+            if len(ts) == 0 or (end is not None and ts[0] >= end) or (start is not None and ts[-1] < start):
+                continue
+            lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+            hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="left"))
+            timestamps.append(ts[lo:hi])
+            landmarks.append(self._open(chunk, "landmarks")[lo:hi])
+            labels.append(self._open(chunk, "labels")[lo:hi, 0])
+
+        if self._buffered:
+            ts = self._buffer["timestamps"][:self._buffered, 0]
+            keep = np.ones(len(ts), dtype=bool)
+            if start is not None:
+                keep &= ts >= start
+            if end is not None:
+                keep &= ts < end
+            timestamps.append(ts[keep])
+            landmarks.append(self._buffer["landmarks"][:self._buffered][keep])
+            labels.append(self._buffer["labels"][:self._buffered, 0][keep])
+
+        if not timestamps:
+            return (np.empty(0, np.float64), np.empty((0, LANDMARK_COUNT, LANDMARK_FIELDS), np.float32),
+                    np.empty(0, np.int8))
+        return (np.concatenate(timestamps),
+                np.concatenate(landmarks).reshape(-1, LANDMARK_COUNT, LANDMARK_FIELDS),
+                np.concatenate(labels))
+
+    def posture_summary(self, start=None, end=None, max_gap=60.0, classifier=None):
+        """
+        Time spent in each posture between `start` and `end`, e.g. the last night:
+        {label: {"seconds": ..., "frames": ...}}. Each frame counts until the next
+        one, at most `max_gap` seconds (camera or script down). With a
+        `classifier`, labels are recomputed from the landmarks instead of read.
+        """
+        timestamps, landmarks, labels = self.query(start, end)
+        if classifier is not None:
+            labels = classifier.classify_batch(landmarks)
+        durations = np.minimum(np.diff(timestamps, append=timestamps[-1] if len(timestamps) else 0), max_gap)
+        summary = {}
+        for code, label in enumerate(POSTURE_LABELS):
+            mask = labels == code
+            summary[label] = {"seconds": float(durations[mask].sum()), "frames": int(mask.sum())}
+        return summary
+
+    def reclassify(self, classifier, start=None, end=None, write=False):
+        """
+        Re-run `classifier` over a time range, e.g. after tuning thresholds.
+        Returns the new codes; with `write`, they replace the stored labels.
+        """
+        if self.writer:
+            self.flush()
+        codes = []
+        for chunk in self._chunks:
+            ts = self._open(chunk, "timestamps")[:, 0]
+            if len(ts) == 0 or (end is not None and ts[0] >= end) or (start is not None and ts[-1] < start):
+                continue
+            lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+            hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="left"))
+            landmarks = self._open(chunk, "landmarks")[lo:hi].reshape(-1, LANDMARK_COUNT, LANDMARK_FIELDS)
+            chunk_codes = classifier.classify_batch(landmarks)
+            if write and len(chunk_codes):
+                labels = self._open(chunk, "labels", mode="r+")
+                labels[lo:hi, 0] = chunk_codes
+                labels.flush()
+            codes.append(chunk_codes)
+        return np.concatenate(codes) if codes else np.empty(0, np.int8)
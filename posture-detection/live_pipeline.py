@@ -0,0 +1,216 @@
+import threading
+import time
+
+import cv2
+
+from frame_hub import Subscriber
+from stage_timer import StageTimer
+
+ALERT_POSTURES = ("tummy", "side")
+
+
+class Packet:
+    """One camera frame on its way through the pipeline."""
+
+    __slots__ = ("seq", "frame", "captured_at", "results", "posture", "image")
+
+    def __init__(self, seq, frame, captured_at):
+        self.seq = seq
+        self.frame = frame
+        self.captured_at = captured_at
+        self.results = None
+        self.posture = None
+        # What the sinks receive; set by `annotate`, defaults to the frame
+        self.image = frame
+
+
+class LivePipeline:
+    """
+    Capture, inference and output on separate threads.
+
+    `capture()` returns the next camera frame (None to stop) and runs on its
+    own thread, so the camera keeps reading while pose runs. `infer(frame)`
+    returns (results, posture) and runs on a second thread. Output runs on
+    the thread that calls `run()` (cv2.imshow must stay on the main thread):
+    `annotate(packet)` returns the image to show and every sink is called
+    with the packet. A sink returning False stops the pipeline.
+
+    The stages are joined by one-slot queues that drop the older frame, so
+    inference always starts on the newest capture and the alert shown is for
+    the freshest frame rather than one that sat in a buffer. Glass-to-alert
+    latency (capture to output) is recorded in `timer`.
+
+    `max_fps` paces the capture thread for cameras whose read returns
+    immediately with the current frame (picamzero) instead of blocking.
+    """
+
+    def __init__(self, capture, infer, sinks=(), annotate=None, timer=None, max_fps=None):
+        self.capture = capture
+        self.infer = infer
+        self.sinks = list(sinks)
+        self.annotate = annotate
+        self.timer = timer or StageTimer(report_interval=60.0)
+        self.capture_interval = 1.0 / max_fps if max_fps else 0.0
+        self._to_infer = Subscriber(maxsize=1)
+        self._to_output = Subscriber(maxsize=1)
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_posture = None
+
+    @property
+    def dropped(self):
+        """Frames replaced by a newer one before inference or output got to them."""
+        return self._to_infer.dropped + self._to_output.dropped
+
+    def _capture_loop(self):
+        seq = 0
+        deadline = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                if self.capture_interval:
+                    deadline += self.capture_interval
+                    delay = deadline - time.monotonic()
+                    if delay > 0:
+                        self._stop.wait(delay)
+                    else:
+                        # Fell behind; restart the schedule instead of bursting
+                        deadline = time.monotonic()
+                with self.timer.stage("capture"):
+                    frame = self.capture()
+                if frame is None:
+                    print("Error: Failed to capture image.")
+                    break
+                seq += 1
+                self._to_infer.put(Packet(seq, frame, time.monotonic()))
+        finally:
+            self._to_infer.close()
+
+    def _infer_loop(self):
+        try:
+            while not self._stop.is_set():
+                packet = self._to_infer.get()
+                if packet is None:
+                    break
+                packet.results, packet.posture = self.infer(packet.frame)
+                self._to_output.put(packet)
+        finally:
+            self._to_output.close()
+
+    def run(self):
+        """Start capture and inference, then handle output until a sink or the camera stops."""
+        for target in (self._capture_loop, self._infer_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        try:
+            while True:
+                packet = self._to_output.get()
+                if packet is None or not self._output(packet):
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _output(self, packet):
+        if self.annotate is not None:
+            with self.timer.stage("draw"):
+                packet.image = self.annotate(packet)
+        keep_going = True
+        for sink in self.sinks:
+            if sink(packet) is False:
+                keep_going = False
+
+        latency = time.monotonic() - packet.captured_at
+        self.timer.record("glass_to_alert", latency)
+        if packet.posture != self._last_posture:
+            if packet.posture in ALERT_POSTURES:
+                print(f"Alert: baby is sleeping on {packet.posture} "
+                      f"(glass-to-alert {latency * 1000:.0f} ms)")
+            self._last_posture = packet.posture
+        self.timer.frame_done()
+        return keep_going
+
+    def stop(self):
+        self._stop.set()
+        self._to_infer.close()
+        self._to_output.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+        print(f"Pipeline: {self.dropped} stale frames dropped")
+        print(self.timer.table())
+
+
+class DisplaySink:
+    """Shows frames in an OpenCV window; stops the pipeline when 'q' is pressed."""
+
+    def __init__(self, window_name='Baby Movement Detection'):
+        self.window_name = window_name
+
+    def __call__(self, packet):
+        cv2.imshow(self.window_name, packet.image)
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class VideoFileSink:
+    """Writes frames to a video file, sized from the first frame."""
+
+    def __init__(self, path, fps=15.0, fourcc="mp4v"):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self._writer = None
+
+    def __call__(self, packet):
+        if self._writer is None:
+            height, width = packet.image.shape[:2]
+            self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc),
+                                           self.fps, (width, height))
+        self._writer.write(packet.image)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+
+class NetworkSink:
+    """
+    Hands JPEG-encoded frames to `send(jpeg_bytes, packet)`, e.g. a websocket
+    broadcaster or an HTTP upload. Encoding and sending run on their own
+    thread behind a one-slot queue, so a slow network never holds up output.
+    """
+
+    def __init__(self, send, quality=80):
+        self.send = send
+        self.quality = quality
+        self._pending = Subscriber(maxsize=1)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __call__(self, packet):
+        self._pending.put(packet)
+
+    def _run(self):
+        while True:
+            packet = self._pending.get()
+            if packet is None:
+                return
+            ret, buffer = cv2.imencode('.jpg', packet.image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ret:
+                continue
+            try:
+                self.send(buffer.tobytes(), packet)
+            except Exception as e:
+                print(f"Network sink failed: {e}")
+
+    def close(self):
+        self._pending.close()
+        self._thread.join(timeout=2.0)
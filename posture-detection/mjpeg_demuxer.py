@@ -0,0 +1,173 @@
+SOI = b"\xff\xd8"  # JPEG start of image
+EOI = b"\xff\xd9"  # JPEG end of image
+HEADER_END = b"\r\n\r\n"
+
+# Parser states
+_PART_HEADER, _PART_BODY, _JPEG_START, _JPEG_END = range(4)
+
+
+def boundary_from_content_type(content_type):
+    """
+    Return the multipart boundary from a Content-Type header such as
+    "multipart/x-mixed-replace; boundary=frame", or None.
+    """
+    if not content_type:
+        return None
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary" and value:
+            value = value.strip('"')
+            # Some servers (wrongly) include the leading dashes in the header
+            return value[2:] if value.startswith("--") else value
+    return None
+
+
+class MJPEGDemuxer:
+    """
+    Incremental MJPEG stream parser.
+
+    Data is kept in one growing bytearray and parsed from where the last scan
+    stopped, so each byte is scanned once and consumed data is dropped with an
+    occasional compaction instead of a copy per chunk.
+
+    With a multipart boundary, each part's Content-Length is used when the
+    server sends one, so the JPEG payload is not scanned at all. Without it
+    (or without a boundary) frames are found by their SOI/EOI markers.
+
+    Frames are yielded as memoryviews into the internal buffer. A view is only
+    valid until the next frame is requested; call bytes(view) to keep it.
+    """
+
+    def __init__(self, boundary=None, read_size=16384, max_frame_size=4 * 1024 * 1024):
+        if isinstance(boundary, str):
+            boundary = boundary.encode()
+        self.boundary = b"--" + boundary if boundary else None
+        self.read_size = read_size
+        self.max_frame_size = max_frame_size
+        self._buf = bytearray(read_size * 4)
+        self._start = 0  # first unconsumed byte
+        self._end = 0  # end of valid data
+        self._scan = 0  # where the next marker search starts
+        self._length = None  # Content-Length of the current part
+        self._state = _PART_HEADER if self.boundary else _JPEG_START
+
+    def iter_frames(self, source):
+        """
+        Yield JPEG frames from `source`: either a file-like object (e.g.
+        `requests` response.raw) or an iterable of byte chunks.
+
+        readinto1/read1 are preferred when the source has them: they return
+        whatever has arrived, where readinto waits for a full `read_size`, so
+        a frame smaller than that (or the last one before the camera pauses)
+        would be held back until more data came in.
+        """
+        if hasattr(source, "readinto1") or not hasattr(source, "read1") and hasattr(source, "readinto"):
+            readinto = getattr(source, "readinto1", None) or source.readinto
+            while True:
+                self._reserve(self.read_size)
+                with memoryview(self._buf) as view:
+                    n = readinto(view[self._end:self._end + self.read_size])
+                if not n:
+                    return
+                self._end += n
+                yield from self._frames()
+        elif hasattr(source, "read1"):
+            # urllib3 responses have read1 but no readinto1
+            while True:
+                chunk = source.read1(self.read_size)
+                if not chunk:
+                    return
+                yield from self.feed(chunk)
+        else:
+            for chunk in source:
+                yield from self.feed(chunk)
+
+    def feed(self, data):
+        """Append a chunk of stream data and yield any frames it completes."""
+        self._reserve(len(data))
+        self._buf[self._end:self._end + len(data)] = data
+        self._end += len(data)
+        return self._frames()
+
+    def _reserve(self, size):
+        """Make room for `size` more bytes after the valid data."""
+        if len(self._buf) - self._end >= size:
+            return
+        if self._start:
+            # Drop consumed bytes; one memmove amortised over many frames
+            del self._buf[:self._start]
+            self._end -= self._start
+            self._scan -= self._start
+            self._start = 0
+        if len(self._buf) - self._end < size:
+            self._buf.extend(bytes(max(size, len(self._buf))))
+
+    def _emit(self, start, end):
+        view = memoryview(self._buf)
+        frame = view[start:end]
+        try:
+            yield frame
+        finally:
+            # The buffer cannot be resized while views into it exist
+            frame.release()
+            view.release()
+
+    def _frames(self):
+        buf = self._buf
+        while True:
+            if self._state == _PART_HEADER:
+                marker = buf.find(self.boundary, self._scan, self._end)
+                if marker == -1:
+                    # Keep a tail in case the boundary straddles two reads
+                    self._start = self._scan = max(self._start, self._end - len(self.boundary) + 1)
+                    return
+                header_end = buf.find(HEADER_END, marker, self._end)
+                if header_end == -1:
+                    self._start = self._scan = marker
+                    return
+                self._length = self._content_length(marker, header_end)
+                self._start = self._scan = header_end + len(HEADER_END)
+                self._state = _PART_BODY if self._length is not None else _JPEG_START
+
+            elif self._state == _PART_BODY:
+                if self._end - self._start < self._length:
+                    return
+                end = self._start + self._length
+                yield from self._emit(self._start, end)
+                self._start = self._scan = end
+                self._state = _PART_HEADER
+
+            elif self._state == _JPEG_START:
+                soi = buf.find(SOI, self._scan, self._end)
+                if soi == -1:
+                    self._start = self._scan = max(self._start, self._end - 1)
+                    return
+                self._start = soi
+                self._scan = soi + len(SOI)
+                self._state = _JPEG_END
+
+            else:  # _JPEG_END
+                eoi = buf.find(EOI, self._scan, self._end)
+                if eoi == -1:
+                    if self._end - self._start > self.max_frame_size:
+                        # Lost sync (corrupt or truncated frame); drop it and rescan
+                        self._start = self._scan = self._end
+                        self._state = _PART_HEADER if self.boundary else _JPEG_START
+                        return
+                    self._scan = max(self._scan, self._end - 1)
+                    return
+                end = eoi + len(EOI)
+                yield from self._emit(self._start, end)
+                self._start = self._scan = end
+                self._state = _PART_HEADER if self.boundary else _JPEG_START
+
+    def _content_length(self, start, end):
+        for line in self._buf[start:end].split(b"\r\n")[1:]:
+            key, _, value = line.partition(b":")
+            if key.strip().lower() == b"content-length":
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    return None
+                return length if 0 < length <= self.max_frame_size else None
+        return None
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap scene-change check in front of pose inference.
+
+    Each frame is shrunk to a small grayscale thumbnail and compared with the
+    thumbnail from the last frame that was sent to inference. If less than
+    `min_changed` of the pixels moved by more than `pixel_threshold` grey
+    levels, the caller can reuse its previous result. A fresh inference is
+    still forced every `max_interval` seconds. Frames are BGR (OpenCV
+    capture) unless `rgb` is set.
+    """
+
+    def __init__(self, size=(64, 48), pixel_threshold=12, min_changed=0.01, max_interval=10.0,
+                 rgb=False, report_interval=None):
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.max_interval = max_interval
+        self.rgb = rgb
+        self.report_interval = report_interval
+        self._reference = None
+        self._last_inference = 0.0
+        self._last_report = time.monotonic()
+        self.inferences = 0
+        self.skipped = 0
+
+    def thumbnail(self, frame):
+        import cv2
+
+        # Downscale before the colour conversion so cvtColor touches few pixels
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_RGB2GRAY if self.rgb else cv2.COLOR_BGR2GRAY)
+
+    def should_infer(self, frame, now=None):
+        now = time.monotonic() if now is None else now
+        thumb = self.thumbnail(frame)
+        if self._reference is None or now - self._last_inference >= self.max_interval:
+            run = True
+        else:
+            diff = np.abs(thumb.astype(np.int16) - self._reference)
+            run = bool(np.count_nonzero(diff > self.pixel_threshold) >= self.min_changed * diff.size)
+        if run:
+            self._reference = thumb
+            self._last_inference = now
+            self.inferences += 1
+        else:
+            self.skipped += 1
+        if self.report_interval is not None and now - self._last_report >= self.report_interval:
+            print(self.summary())
+            self._last_report = now
+        return run
+
+    def summary(self):
+        total = self.inferences + self.skipped
+        ratio = self.skipped / total * 100 if total else 0.0
+        return f"Motion gate: {self.inferences} inferences run, {self.skipped} skipped ({ratio:.0f}%)"
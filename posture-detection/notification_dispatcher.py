@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import OrderedDict
+
+from backoff import retry
+
+
+class ConsoleTransport:
+    """Prints notifications; the behaviour of the original send_notification."""
+
+    def send(self, recipient, message):
+        prefix = f"[{message['stream']}] " if message["stream"] is not None else ""
+        print(f"Notification sent: {prefix}{message['text']}")
+
+
+class WebhookTransport:
+    """POSTs each notification as JSON, e.g. to a push gateway or an SMS relay."""
+
+    def __init__(self, url, timeout=5.0):
+        import requests
+
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def send(self, recipient, message):
+        response = self._session.post(self.url, json=dict(message, recipient=recipient), timeout=self.timeout)
+        response.raise_for_status()
+
+
+class NotificationDispatcher:
+    """
+    Sends posture notifications off the frame path.
+
+    notify() only updates in-memory state and never blocks on a transport.
+    Per stream, a state equal to the one last sent (or already pending) is
+    dropped as a duplicate. The first change after a quiet period goes out
+    at once; further changes within `coalesce_window` seconds replace each
+    other and only the final state is sent when the window ends, or nothing
+    if the stream flipped back. Each recipient has a token bucket of
+    `burst` messages refilled at `rate_per_minute`; while it is empty that
+    recipient's messages wait, keeping only the latest per stream. At most
+    `queue_size` streams can have a notification pending; past that the
+    oldest is dropped. Each recipient has its own sender thread, so a slow
+    or failing transport (retried with exponential backoff) only delays
+    that recipient's messages.
+    """
+
+    def __init__(self, recipients, queue_size=64, coalesce_window=2.0, rate_per_minute=6.0, burst=3,
+                 max_retries=3, backoff=0.5, max_backoff=10.0):
+        # recipient name -> transport with send(recipient, message)
+        self.recipients = dict(recipients)
+        self.queue_size = queue_size
+        self.coalesce_window = coalesce_window
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # stream -> message waiting for its coalescing window
+        self._pending = OrderedDict()
+        self._sent_state = {}
+        self._sent_at = {}
+        # recipient -> OrderedDict(stream -> message) waiting for a token
+        self._outbox = {name: OrderedDict() for name in self.recipients}
+        self._tokens = {name: (float(burst), time.monotonic()) for name in self.recipients}
+        self._cond = threading.Condition()
+        self._closed = False
+        # Recipients whose sender is in the middle of a send
+        self._busy = set()
+        self.stats = {"accepted": 0, "duplicates": 0, "coalesced": 0, "dropped": 0,
+                      "superseded": 0, "sent": 0, "retries": 0, "failures": 0}
+        self._threads = [threading.Thread(target=self._run, args=(name,), name=f"notify-{name}", daemon=True)
+                         for name in self.recipients]
+        for thread in self._threads:
+            thread.start()
+
+    def notify(self, stream, state, text, force=False):
+        """
+        Queue a notification that `stream` is now in `state`. Returns False if
+        nothing was queued: a duplicate, or a flip back to the last sent state
+        that cancelled the pending one. `force` skips dedup and coalescing
+        (manual notifications), but not rate limiting.
+        """
+        now = time.monotonic()
+        with self._cond:
+            pending = self._pending.get(stream)
+            if not force:
+                current = pending["state"] if pending is not None else self._sent_state.get(stream)
+                if state == current:
+                    self.stats["duplicates"] += 1
+                    return False
+                if pending is not None:
+                    self.stats["coalesced"] += 1
+                    if state == self._sent_state.get(stream):
+                        # Flipped back within the window: nothing to tell anyone
+                        del self._pending[stream]
+                        return False
+            if pending is None and len(self._pending) >= self.queue_size:
+                self._pending.popitem(last=False)
+                self.stats["dropped"] += 1
+            due = now if force else max(now, self._sent_at.get(stream, 0.0) + self.coalesce_window)
+            self._pending[stream] = {"stream": stream, "state": state, "text": text, "time": time.time(),
+                                     "due": due, "coalesced": pending["coalesced"] + 1 if pending else 0}
+            self._pending.move_to_end(stream)
+            self.stats["accepted"] += 1
+            self._cond.notify()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until every pending notification has been sent (or given up on)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or any(self._outbox.values()) or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _take_token(self, name, now):
+        """Consume one of `name`'s tokens; returns 0, or the seconds until one is available."""
+        tokens, updated = self._tokens[name]
+        tokens = min(self.burst, tokens + (now - updated) * self.rate_per_minute / 60.0)
+        if tokens >= 1:
+            self._tokens[name] = (tokens - 1, now)
+            return 0.0
+        self._tokens[name] = (tokens, now)
+        return (1 - tokens) * 60.0 / self.rate_per_minute
+
+    def _next_send(self, name, now):
+        """Move due notifications to the outboxes and pick one for `name`; else the seconds to wait."""
+        for stream, message in list(self._pending.items()):
+            if message["due"] <= now:
+                del self._pending[stream]
+                self._sent_state[stream] = message["state"]
+                self._sent_at[stream] = now
+                for outbox in self._outbox.values():
+                    if stream in outbox:
+                        # Still waiting on the rate limit; only the newest state goes out
+                        self.stats["superseded"] += 1
+                    outbox[stream] = message
+                    outbox.move_to_end(stream)
+                # Wake the other recipients' senders for their copy
+                self._cond.notify_all()
+
+        wait = None
+        outbox = self._outbox[name]
+        if outbox:
+            delay = self._take_token(name, now)
+            if delay == 0:
+                return outbox.popitem(last=False)[1], None
+            wait = delay
+        for message in self._pending.values():
+            delay = message["due"] - now
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _send(self, name, message):
+        payload = {key: message[key] for key in ("stream", "state", "text", "time", "coalesced")}
+        try:
+            retry(self.recipients[name].send, name, payload, retries=self.max_retries, backoff=self.backoff,
+                  max_backoff=self.max_backoff, on_retry=lambda error: self._count("retries"),
+                  give_up=lambda: self._closed)
+        except Exception as e:
+            self._count("failures")
+            print(f"Notification to {name} failed, giving up: {e}")
+            return
+        self._count("sent")
+
+    def _count(self, key):
+        # Senders run on one thread per recipient
+        with self._cond:
+            self.stats[key] += 1
+
+    def _run(self, name):
+        while True:
+            with self._cond:
+                while True:
+                    message, wait = self._next_send(name, time.monotonic())
+                    if message is not None:
+                        break
+                    if self._closed:
+                        return
+                    self._cond.wait(wait)
+                self._busy.add(name)
+
+            try:
+                self._send(name, message)
+            finally:
+                with self._cond:
+                    self._busy.discard(name)
+                    self._cond.notify_all()
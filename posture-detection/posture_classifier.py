@@ -0,0 +1,149 @@
+import numpy as np
+
+# MediaPipe pose landmark indices (same values as mp_pose.PoseLandmark) so this
+# module can be imported without loading mediapipe
+NOSE = 0
+LEFT_EYE = 2
+RIGHT_EYE = 5
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+
+LANDMARK_COUNT = 33
+# Columns of a landmark array: x, y, z, visibility
+LANDMARK_FIELDS = 4
+X, Y, Z, VISIBILITY = range(LANDMARK_FIELDS)
+
+# Posture codes returned by classify_batch; index into POSTURE_LABELS
+NONE, NORMAL, SIDE, TUMMY = range(4)
+POSTURE_LABELS = ("none", "normal", "side", "tummy")
+
+# Thresholds per deployment. A threshold set to None disables that check.
+#   tummy_shoulder_dx: shoulders closer together than this (horizontally) -> tummy
+#   tummy_nose_dx:     nose centred between the shoulders and below them -> tummy
+#   side_eye_dx:       eyes closer together than this (horizontally) -> side
+POSTURE_PROFILES = {
+    # Webcam scripts and the Flask processed feed
+    "webcam": {"tummy_shoulder_dx": 0.3, "tummy_nose_dx": None, "side_eye_dx": 0.07},
+    # pi_baby_movement.py on the Raspberry Pi camera
+    "pi": {"tummy_shoulder_dx": None, "tummy_nose_dx": 0.05, "side_eye_dx": 0.02},
+    # The hosted FastAPI /process-frame/ service only reports side sleeping
+    "api": {"tummy_shoulder_dx": None, "tummy_nose_dx": None, "side_eye_dx": 0.02},
+}
+
+
+def landmarks_to_array(pose_landmarks, out=None):
+    """
+    Convert MediaPipe pose landmarks into a (33, 4) float32 array of
+    x, y, z, visibility. Pass `out` to reuse an existing buffer.
+    """
+    if out is None:
+        out = np.empty((LANDMARK_COUNT, LANDMARK_FIELDS), dtype=np.float32)
+    for i, lm in enumerate(pose_landmarks.landmark):
+        row = out[i]
+        row[X] = lm.x
+        row[Y] = lm.y
+        row[Z] = lm.z
+        row[VISIBILITY] = lm.visibility
+    return out
+
+
+def results_to_array(results, out=None):
+    """
+    Convert a `pose.process` result into a landmark array. Frames without a
+    detected pose become an all-NaN array, which classifies as "none".
+    """
+    if results.pose_landmarks is None:
+        if out is None:
+            out = np.empty((LANDMARK_COUNT, LANDMARK_FIELDS), dtype=np.float32)
+        out.fill(np.nan)
+        return out
+    return landmarks_to_array(results.pose_landmarks, out)
+
+
+# Wire format of landmark uploads: (33, 4) little-endian float32 per frame, 528 bytes
+LANDMARK_PAYLOAD_BYTES = LANDMARK_COUNT * LANDMARK_FIELDS * 4
+
+
+def pack_landmarks(landmarks):
+    """Serialise one (33, 4) array or an (N, 33, 4) batch for upload."""
+    return np.ascontiguousarray(landmarks, dtype="<f4").tobytes()
+
+
+def unpack_landmarks(data):
+    """
+    Parse an upload from pack_landmarks into an (N, 33, 4) float32 array.
+    Raises ValueError if the size is not a whole number of frames.
+    """
+    if not data or len(data) % LANDMARK_PAYLOAD_BYTES:
+        raise ValueError(f"Expected a multiple of {LANDMARK_PAYLOAD_BYTES} bytes, got {len(data)}")
+    frames = np.frombuffer(data, dtype="<f4").reshape(-1, LANDMARK_COUNT, LANDMARK_FIELDS)
+    return frames.astype(np.float32, copy=False)
+
+
+class PostureClassifier:
+    """
+    Vectorised tummy/side sleeping checks shared by every detection script.
+
+    classify_batch scores an (N, 33, 4) array in one NumPy pass, classify
+    handles a single MediaPipe result.
+    """
+
+    def __init__(self, profile="webcam", **overrides):
+        if profile not in POSTURE_PROFILES:
+            raise ValueError(f"Unknown posture profile: {profile}")
+        thresholds = dict(POSTURE_PROFILES[profile])
+        for key, value in overrides.items():
+            if key not in thresholds:
+                raise ValueError(f"Unknown posture threshold: {key}")
+            thresholds[key] = value
+        self.profile = profile
+        self.tummy_shoulder_dx = thresholds["tummy_shoulder_dx"]
+        self.tummy_nose_dx = thresholds["tummy_nose_dx"]
+        self.side_eye_dx = thresholds["side_eye_dx"]
+
+    def classify_batch(self, frames):
+        """Return an int8 posture code per frame of an (N, 33, 4) array."""
+        frames = np.asarray(frames, dtype=np.float32)
+        if frames.ndim == 2:
+            frames = frames[np.newaxis]
+        x = frames[:, :, X]
+        y = frames[:, :, Y]
+
+        nose_x = x[:, NOSE]
+        left_shoulder_x = x[:, LEFT_SHOULDER]
+        right_shoulder_x = x[:, RIGHT_SHOULDER]
+
+        tummy = np.zeros(len(frames), dtype=bool)
+        if self.tummy_shoulder_dx is not None:
+            tummy |= np.abs(left_shoulder_x - right_shoulder_x) < self.tummy_shoulder_dx
+        if self.tummy_nose_dx is not None:
+            shoulder_mid_x = (left_shoulder_x + right_shoulder_x) / 2
+            nose_y = y[:, NOSE]
+            tummy |= ((np.abs(nose_x - shoulder_mid_x) < self.tummy_nose_dx)
+                      & (nose_y > y[:, LEFT_SHOULDER])
+                      & (nose_y > y[:, RIGHT_SHOULDER]))
+
+        side = np.zeros(len(frames), dtype=bool)
+        if self.side_eye_dx is not None:
+            side = np.abs(x[:, LEFT_EYE] - x[:, RIGHT_EYE]) < self.side_eye_dx
+
+        codes = np.full(len(frames), NORMAL, dtype=np.int8)
+        codes[side] = SIDE
+        codes[tummy] = TUMMY
+        # NaN rows are frames where no pose was detected
+        codes[np.isnan(x[:, NOSE])] = NONE
+        return codes
+
+    def classify_array(self, landmarks):
+        """Return the posture label for a single (33, 4) landmark array."""
+        return POSTURE_LABELS[self.classify_batch(landmarks)[0]]
+
+    def classify(self, pose_landmarks):
+        """Return the posture label for MediaPipe `results.pose_landmarks`."""
+        if pose_landmarks is None:
+            return POSTURE_LABELS[NONE]
+        return self.classify_array(landmarks_to_array(pose_landmarks))
+
+    @staticmethod
+    def labels(codes):
+        return [POSTURE_LABELS[code] for code in codes]
@@ -0,0 +1,68 @@
+import os
+
+import cv2
+import numpy as np
+
+from stage_timer import NULL_TIMER
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".h264")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def find_clips(path):
+    """
+    Return the recordings under `path`: video files (e.g. from record_video.py)
+    and directories of JPEG/PNG frames. `path` may itself be a single clip.
+    """
+    if os.path.isfile(path) or _is_frame_dir(path):
+        return [path]
+    clips = []
+    for entry in sorted(os.listdir(path)):
+        full = os.path.join(path, entry)
+        if entry.lower().endswith(VIDEO_EXTENSIONS) or (os.path.isdir(full) and _is_frame_dir(full)):
+            clips.append(full)
+    return clips
+
+
+def _is_frame_dir(path):
+    return os.path.isdir(path) and any(name.lower().endswith(IMAGE_EXTENSIONS) for name in os.listdir(path))
+
+
+def iter_frame_files(path):
+    """Yield the image files of a frame directory in name order."""
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            yield os.path.join(path, name)
+
+
+def iter_frames(path, timer=NULL_TIMER):
+    """
+    Yield BGR frames from a video file or a directory of images.
+
+    Reading the file (or grabbing the next video packet) is timed as the
+    "capture" stage and turning it into pixels as "decode".
+    """
+    if os.path.isdir(path):
+        for file_path in iter_frame_files(path):
+            with timer.stage("capture"):
+                data = np.fromfile(file_path, dtype=np.uint8)
+            with timer.stage("decode"):
+                frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            if frame is not None:
+                yield frame
+        return
+
+    capture = cv2.VideoCapture(os.path.expanduser(path))
+    try:
+        while True:
+            with timer.stage("capture"):
+                ret = capture.grab()
+            if not ret:
+                return
+            with timer.stage("decode"):
+                ret, frame = capture.retrieve()
+            if not ret:
+                return
+            yield frame
+    finally:
+        capture.release()
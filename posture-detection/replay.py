@@ -0,0 +1,98 @@
+"""
+Replay recorded clips through the detection pipeline without a camera or display.
+
+Runs capture -> decode -> convert -> pose -> classify -> draw -> encode on
+every frame of the given MP4 files and/or JPEG frame directories, then
+prints a per-stage latency table and the overall throughput.
+
+Usage: python replay.py CLIPS [--profile desktop] [--posture webcam] [--motion-gate] [--json out.json]
+"""
+import argparse
+import json
+from collections import Counter
+
+import cv2
+import mediapipe as mp
+
+from inference_profiles import INFERENCE_PROFILES, create_pose
+from motion_gate import MotionGate
+from posture_classifier import POSTURE_PROFILES, PostureClassifier
+from recordings import find_clips, iter_frames
+from roi_tracker import RoiTracker
+from stage_timer import StageTimer
+
+mp_pose = mp.solutions.pose
+mp_drawing = mp.solutions.drawing_utils
+
+ALERTS = {
+    "tummy": ('Alert: Baby is sleeping on tummy!', (50, 50), (0, 0, 255)),
+    "side": ('Alert: Baby is sleeping on side!', (50, 100), (0, 0, 255)),
+    "normal": ('Normal: Baby is in a safe position.', (50, 150), (0, 255, 0)),
+}
+
+
+def replay_clip(path, pose, classifier, tracker, timer, gate=None, quality=90, postures=None):
+    """Run one clip through the pipeline, recording every stage in `timer`."""
+    results = None
+    for frame in iter_frames(path, timer=timer):
+        if gate is None or gate.should_infer(frame) or results is None:
+            results = tracker.process(pose, frame, timer=timer)
+
+        with timer.stage("classify"):
+            posture = classifier.classify(results.pose_landmarks)
+        if postures is not None:
+            postures[posture] += 1
+
+        with timer.stage("draw"):
+            if results.pose_landmarks:
+                mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+            if posture in ALERTS:
+                text, origin, colour = ALERTS[posture]
+                cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1, colour, 2, cv2.LINE_AA)
+
+        with timer.stage("encode"):
+            cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        timer.frame_done()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clips", help="MP4 file, JPEG frame directory, or a directory of either")
+    parser.add_argument("--profile", default="desktop", choices=list(INFERENCE_PROFILES),
+                        help="inference profile")
+    parser.add_argument("--posture", default="webcam", choices=list(POSTURE_PROFILES),
+                        help="posture threshold profile")
+    parser.add_argument("--motion-gate", action="store_true", help="skip inference on static frames")
+    parser.add_argument("--quality", type=int, default=90, help="JPEG encode quality")
+    parser.add_argument("--json", help="also write the stage statistics to this file")
+    args = parser.parse_args()
+
+    clips = find_clips(args.clips)
+    if not clips:
+        parser.error(f"No recordings found in {args.clips}")
+
+    profile = INFERENCE_PROFILES[args.profile]
+    classifier = PostureClassifier(args.posture)
+    timer = StageTimer(window=None)
+    postures = Counter()
+    for clip in clips:
+        # Fresh graph, tracker and gate per clip so state does not leak between recordings
+        pose = create_pose(profile)
+        gate = MotionGate() if args.motion_gate else None
+        tracker = RoiTracker(max_side=profile["max_side"], reset_on_move=not profile["static_image_mode"])
+        replay_clip(clip, pose, classifier, tracker, timer, gate=gate, quality=args.quality, postures=postures)
+        pose.close()
+
+    print(f"{len(clips)} clip(s), inference profile: {args.profile}")
+    print(timer.table())
+    print("Postures: " + ", ".join(f"{name} {count}" for name, count in postures.most_common()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"clips": clips, "profile": args.profile, "frames": timer.frames,
+                       "fps": timer.throughput(), "stages": timer.stats(),
+                       "postures": dict(postures)}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
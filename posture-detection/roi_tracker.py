@@ -0,0 +1,141 @@
+import numpy as np
+
+from posture_classifier import VISIBILITY, X, Y, landmarks_to_array
+from stage_timer import NULL_TIMER
+
+
+class RoiTracker:
+    """
+    Runs pose inference on a cropped, downscaled region of interest.
+
+    The region is a padded bounding box around the last detected landmarks,
+    inside `crib_rect` (x0, y0, x1, y1 in pixels) if one is configured. When
+    the pose is lost for `lost_after` frames in a row the tracker falls back
+    to the crib rectangle, or the full frame without one. Landmarks are mapped
+    back to full-frame normalised coordinates, so the posture thresholds
+    behave as if the whole frame had been processed.
+
+    The crop stays put while the landmarks stay well inside it, and only
+    moves when they near its edge or it has become much larger than needed.
+    MediaPipe's tracking and landmark smoothing (static_image_mode=False)
+    work in the crop's coordinates, so with `reset_on_move` the Pose graph
+    is reset whenever the crop does move, instead of carrying landmarks
+    from the old crop into the new one.
+    """
+
+    def __init__(self, crib_rect=None, padding=0.3, max_side=320, lost_after=3,
+                 min_visibility=0.5, min_size=0.2, reset_on_move=False):
+        self.crib_rect = crib_rect
+        self.padding = padding
+        self.max_side = max_side
+        self.lost_after = lost_after
+        self.min_visibility = min_visibility
+        # Smallest ROI as a fraction of the frame, so a partial detection
+        # cannot shrink the crop until the baby no longer fits
+        self.min_size = min_size
+        self.reset_on_move = reset_on_move
+        self._roi = None
+        self._misses = 0
+        self._last_region = None
+        self.moves = 0
+
+    @property
+    def tracking(self):
+        return self._roi is not None
+
+    def base_region(self, width, height):
+        if self.crib_rect is None:
+            return 0, 0, width, height
+        x0, y0, x1, y1 = self.crib_rect
+        x0, y0, x1, y1 = max(0, x0), max(0, y0), min(width, x1), min(height, y1)
+        if x1 <= x0 or y1 <= y0:
+            # The rectangle lies outside this frame; an empty crop would fail every frame
+            return 0, 0, width, height
+        return x0, y0, x1, y1
+
+    def region(self, width, height):
+        return self._roi if self._roi is not None else self.base_region(width, height)
+
+    def process(self, pose, frame, rgb=False, timer=NULL_TIMER):
+        """
+        Run `pose.process` on the current region of `frame`, which is BGR
+        unless `rgb` is set. The crop and conversion to RGB are timed as the
+        "convert" stage, inference as "pose".
+        """
+        import cv2
+
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = region = self.region(width, height)
+        if self._last_region is not None and region != self._last_region:
+            self.moves += 1
+            if self.reset_on_move:
+                pose.reset()
+        self._last_region = region
+
+        with timer.stage("convert"):
+            crop = frame[y0:y1, x0:x1]
+            # Downscale first so the colour conversion touches fewer pixels
+            scale = self.max_side / max(x1 - x0, y1 - y0)
+            if scale < 1:
+                crop = cv2.resize(crop, (max(1, round((x1 - x0) * scale)), max(1, round((y1 - y0) * scale))),
+                                  interpolation=cv2.INTER_AREA)
+            if not rgb:
+                crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+            crop = np.ascontiguousarray(crop)
+        with timer.stage("pose"):
+            results = pose.process(crop)
+
+        if results.pose_landmarks:
+            self._map_back(results.pose_landmarks, (x0, y0, x1, y1), width, height)
+            self._track(results.pose_landmarks, width, height)
+        else:
+            self._misses += 1
+            if self._misses >= self.lost_after:
+                self._roi = None
+        return results
+
+    def _map_back(self, pose_landmarks, roi, width, height):
+        x0, y0, x1, y1 = roi
+        sx = (x1 - x0) / width
+        sy = (y1 - y0) / height
+        ox = x0 / width
+        oy = y0 / height
+        for lm in pose_landmarks.landmark:
+            lm.x = ox + lm.x * sx
+            lm.y = oy + lm.y * sy
+            # z uses roughly the same scale as x
+            lm.z = lm.z * sx
+
+    def _track(self, pose_landmarks, width, height):
+        landmarks = landmarks_to_array(pose_landmarks)
+        visible = landmarks[landmarks[:, VISIBILITY] >= self.min_visibility]
+        if len(visible) < 4:
+            self._misses += 1
+            if self._misses >= self.lost_after:
+                self._roi = None
+            return
+        self._misses = 0
+
+        bx0, bx1 = visible[:, X].min() * width, visible[:, X].max() * width
+        by0, by1 = visible[:, Y].min() * height, visible[:, Y].max() * height
+        # Pad the landmark box and enforce a minimum size around its centre
+        half_w = max((bx1 - bx0) * (1 + 2 * self.padding), self.min_size * width) / 2
+        half_h = max((by1 - by0) * (1 + 2 * self.padding), self.min_size * height) / 2
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+
+        lx0, ly0, lx1, ly1 = self.base_region(width, height)
+        x0 = int(max(lx0, cx - half_w))
+        y0 = int(max(ly0, cy - half_h))
+        x1 = int(min(lx1, cx + half_w))
+        y1 = int(min(ly1, cy + half_h))
+        if self._roi is not None:
+            # Keep the current crop while it holds the landmarks with half the padding to spare
+            # and is at most twice the area it needs
+            rx0, ry0, rx1, ry1 = self._roi
+            margin_x = (bx1 - bx0) * self.padding / 2
+            margin_y = (by1 - by0) * self.padding / 2
+            inside = (bx0 - margin_x >= rx0 or rx0 <= lx0) and (bx1 + margin_x <= rx1 or rx1 >= lx1) \
+                and (by0 - margin_y >= ry0 or ry0 <= ly0) and (by1 + margin_y <= ry1 or ry1 >= ly1)
+            if inside and (rx1 - rx0) * (ry1 - ry0) <= 2 * (x1 - x0) * (y1 - y0):
+                return
+        self._roi = (x0, y0, x1, y1) if x1 - x0 >= 16 and y1 - y0 >= 16 else None
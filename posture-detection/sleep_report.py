@@ -0,0 +1,57 @@
+"""
+Summarise the posture history logged by LandmarkStore.
+
+Prints how long the baby spent in each posture over the last HOURS hours.
+With --posture, the stored landmarks are re-classified with that threshold
+profile instead of using the logged labels (--write stores the new labels).
+
+Usage: python sleep_report.py [STORE] [--hours 12] [--posture webcam] [--write]
+"""
+import argparse
+import os
+import time
+
+from landmark_store import LandmarkStore
+from posture_classifier import POSTURE_PROFILES, PostureClassifier
+
+
+def format_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h{rest // 60:02d}m"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("store", nargs="?", default="landmark_history", help="landmark store directory")
+    parser.add_argument("--hours", type=float, default=12.0, help="report window, ending now")
+    parser.add_argument("--posture", choices=list(POSTURE_PROFILES),
+                        help="re-classify with this posture threshold profile")
+    parser.add_argument("--write", action="store_true", help="save the re-classified labels")
+    parser.add_argument("--max-gap", type=float, default=60.0,
+                        help="longest gap between frames counted as observed time")
+    args = parser.parse_args()
+    if args.write and not args.posture:
+        parser.error("--write needs --posture")
+
+    if not os.path.isdir(args.store):
+        parser.error(f"No landmark store at {args.store}")
+    # The monitoring script may be writing to the store right now
+    store = LandmarkStore(args.store, writer=False)
+    end = time.time()
+    start = end - args.hours * 3600
+    classifier = PostureClassifier(args.posture) if args.posture else None
+    if classifier is not None and args.write:
+        store.reclassify(classifier, start, end, write=True)
+        classifier = None
+
+    summary = store.posture_summary(start, end, max_gap=args.max_gap, classifier=classifier)
+    observed = sum(entry["seconds"] for entry in summary.values())
+    print(f"Last {args.hours:g} h: {format_duration(observed)} observed, "
+          f"{len(store)} frames stored ({store.disk_bytes() / 1e6:.1f} MB)")
+    for label, entry in summary.items():
+        share = entry["seconds"] / observed if observed else 0.0
+        print(f"  {label:<8}{format_duration(entry['seconds']):>8}{share:>7.1%}{entry['frames']:>9} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import time
+from collections import namedtuple
+
+import cv2
+
+from inference_profiles import create_pose, load_profile
+from roi_tracker import RoiTracker
+
+# Milliseconds spent in each part of one snapshot cycle
+CycleTiming = namedtuple("CycleTiming", ["capture_ms", "inference_ms", "handling_ms", "idle_ms"])
+
+
+def window_wait(seconds):
+    """Wait function for sessions that show a cv2 window."""
+    cv2.waitKey(max(1, int(seconds * 1000)))
+
+
+class JpegFileSink:
+    """Persistence sink that writes the (annotated) snapshot to disk."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, image, results):
+        cv2.imwrite(self.path, image)
+
+
+class SnapshotSession:
+    """
+    Long-lived snapshot mode: the camera and the Pose graph are opened once
+    and reused for every cycle, and frames stay in memory. Sinks (called after
+    the loop body, so they see any overlays) decide whether anything is
+    written to disk.
+
+    `wait` is called with the seconds left in the interval; use window_wait
+    when showing a cv2 window.
+    """
+
+    def __init__(self, camera_index=0, interval=1.0, sinks=(), wait=time.sleep, verbose=True,
+                 crib_rect=None, profile=None):
+        self.camera_index = camera_index
+        self.interval = interval
+        self.sinks = list(sinks)
+        self.wait = wait
+        self.verbose = verbose
+        self.camera = None
+        self.pose = None
+        # Pose settings; defaults to the "snapshot" profile (INFERENCE_PROFILE overrides)
+        self.profile = profile if profile is not None else load_profile("snapshot")[1]
+        self.roi_tracker = RoiTracker(crib_rect=crib_rect, max_side=self.profile["max_side"])
+        self.last_timing = None
+
+    def open(self):
+        self.camera = cv2.VideoCapture(self.camera_index)
+        # Keep only the newest frame so a snapshot is not seconds old
+        self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.pose = create_pose(self.profile)
+        return self
+
+    def close(self):
+        if self.camera is not None:
+            self.camera.release()
+            self.camera = None
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def snapshots(self):
+        """Yield (image, results) once per interval until the caller stops."""
+        while True:
+            cycle_start = time.perf_counter()
+            result, image = self.camera.read()
+            captured = time.perf_counter()
+            if not result:
+                print("Error: Could not capture the image.")
+                self.wait(self.interval)
+                continue
+
+            # Pose runs on the region around the baby, landmarks come back in full-frame coordinates
+            results = self.roi_tracker.process(self.pose, image)
+            inferred = time.perf_counter()
+
+            yield image, results
+
+            for sink in self.sinks:
+                sink(image, results)
+            handled = time.perf_counter()
+
+            idle = max(0.0, self.interval - (handled - cycle_start))
+            self.last_timing = CycleTiming((captured - cycle_start) * 1000,
+                                           (inferred - captured) * 1000,
+                                           (handled - inferred) * 1000,
+                                           idle * 1000)
+            if self.verbose:
+                print("Cycle: capture {:.1f} ms | inference {:.1f} ms | handling {:.1f} ms | "
+                      "idle {:.1f} ms".format(*self.last_timing))
+            self.wait(idle)
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# Stage names used by the detection scripts, in pipeline order
+STAGES = ("capture", "decode", "convert", "pose", "classify", "draw", "encode")
+
+
+class StageTimer:
+    """
+    Per-stage latency hooks for the frame pipelines.
+
+    Wrap each stage in `with timer.stage("pose"):` and call `frame_done()`
+    once per frame. The last `window` samples of every stage are kept (all
+    of them with window=None), so a timer can stay on in a live service.
+    With `report_interval` set, the table is printed every that many
+    seconds, like MotionGate's summary.
+    A disabled timer (NULL_TIMER) costs one attribute lookup per stage.
+
+    With a `histogram` (metrics.Histogram labelled by stage) every sample is
+    also exported, e.g. on a service's /metrics route.
+
+    Safe to share between threads, e.g. the capture and pose threads of a
+    live pipeline or the request threads of the Flask service.
+    """
+
+    def __init__(self, window=1000, report_interval=None, enabled=True, histogram=None):
+        self.window = window
+        self.report_interval = report_interval
+        self.enabled = enabled
+        self.histogram = histogram
+        self._samples = {}
+        self.frames = 0
+        self._started = time.perf_counter()
+        self._last_report = self._started
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self._time(name)
+
+    @contextmanager
+    def _time(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+        if self.histogram is not None:
+            self.histogram.observe(seconds, name)
+
+    def frame_done(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.frames += 1
+            report = False
+            if self.report_interval is not None:
+                now = time.perf_counter()
+                if now - self._last_report >= self.report_interval:
+                    # One thread prints each report
+                    report = True
+                    self._last_report = now
+        if report:
+            print(self.table())
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self.frames = 0
+            self._started = time.perf_counter()
+
+    def stats(self):
+        """Per-stage count and latency percentiles in milliseconds, in pipeline order."""
+        # Copy under the lock; the percentiles are computed outside it
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+        names = [name for name in STAGES if name in samples]
+        names += [name for name in samples if name not in STAGES]
+        stats = {}
+        for name in names:
+            ms = np.array(samples[name], dtype=np.float64) * 1000
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            stats[name] = {"count": len(ms), "total_ms": float(ms.sum()), "mean_ms": float(ms.mean()),
+                           "p50_ms": float(p50), "p90_ms": float(p90), "p99_ms": float(p99),
+                           "max_ms": float(ms.max())}
+        return stats
+
+    def throughput(self):
+        with self._lock:
+            frames, started = self.frames, self._started
+        elapsed = time.perf_counter() - started
+        return frames / elapsed if elapsed > 0 else 0.0
+
+    def table(self):
+        stats = self.stats()
+        # Share of pipeline time; spans such as glass-to-alert overlap the stages, so they get none
+        total = sum(s["total_ms"] for name, s in stats.items() if name in STAGES) or 1.0
+        lines = [f"{'stage':<14} {'count':>7} {'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8} "
+                 f"{'p99 ms':>8} {'max ms':>8} {'share':>6}"]
+        for name, s in stats.items():
+            share = f"{s['total_ms'] / total * 100:5.1f}%" if name in STAGES else f"{'-':>6}"
+            lines.append(f"{name:<14} {s['count']:7d} {s['mean_ms']:8.2f} {s['p50_ms']:8.2f} {s['p90_ms']:8.2f} "
+                         f"{s['p99_ms']:8.2f} {s['max_ms']:8.2f} {share}")
+        with self._lock:
+            frames = self.frames
+        lines.append(f"{frames} frames, {self.throughput():.1f} fps")
+        return "\n".join(lines)
+
+# Shared disabled timer for callers that do not profile
+NULL_TIMER = StageTimer(enabled=False)
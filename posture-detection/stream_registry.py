@@ -0,0 +1,275 @@
+import threading
+import time
+
+import requests
+
+from frame_hub import FrameHub
+from mjpeg_demuxer import MJPEGDemuxer, boundary_from_content_type
+
+SCHEDULING_POLICIES = ("round_robin", "deadline")
+
+
+class InferencePool:
+    """
+    Fixed set of pose workers shared by every stream.
+
+    Each stream has a one-frame slot: submitting a newer frame replaces the
+    waiting one, so the pool holds at most one frame per stream and a busy
+    stream cannot queue work ahead of the others. A stream is never run on
+    two workers at once, which keeps its tracker and posture state serial.
+
+    "round_robin" serves the stream whose slot has waited longest, so every
+    stream with work gets a turn before any stream gets two. "deadline"
+    serves the frame with the earliest deadline (arrival + the stream's
+    latency budget), for cameras with different frame rates or priorities.
+
+    `make_pose()` is called once in each worker thread; MediaPipe graphs are
+    not shared between threads. `warmup(pose)`, if given, runs right after
+    so the graph's first-inference cost is not paid on a camera frame; the
+    pool is `ready` once every worker has done both, and `startup` holds
+    each worker's init and first-inference seconds. If either raises, that
+    worker exits and the error is kept in `startup_error`.
+    """
+
+    def __init__(self, make_pose, workers=2, policy="round_robin", warmup=None):
+        if policy not in SCHEDULING_POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy} (choose from {', '.join(SCHEDULING_POLICIES)})")
+        self.make_pose = make_pose
+        self.workers = workers
+        self.policy = policy
+        self.warmup = warmup
+        self.startup = []
+        self.startup_error = None
+        # stream id -> (waiting since, deadline, job)
+        self._slots = {}
+        self._busy = set()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+        self.dropped = 0
+        self.completed = 0
+
+    @property
+    def pending(self):
+        return len(self._slots)
+
+    @property
+    def ready(self):
+        return len(self.startup) >= self.workers
+
+    def wait_ready(self, timeout=None):
+        """Block until every worker is warmed up; returns False on timeout or if one failed to start."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.ready or self.startup_error is not None, timeout)
+            return self.ready
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"pose-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._slots.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        self._threads = []
+
+    def submit(self, key, job, budget=1.0):
+        """Queue `job(pose)` for stream `key`, replacing its waiting frame if any."""
+        now = time.monotonic()
+        with self._cond:
+            previous = self._slots.get(key)
+            if previous is not None:
+                self.dropped += 1
+                # The stream keeps its place in the rotation
+                now = previous[0]
+            self._slots[key] = (now, time.monotonic() + budget, job)
+            self._cond.notify()
+
+    def discard(self, key):
+        with self._cond:
+            self._slots.pop(key, None)
+
+    def _next(self):
+        ready = [key for key in self._slots if key not in self._busy]
+        if not ready:
+            return None
+        if self.policy == "deadline":
+            return min(ready, key=lambda key: self._slots[key][1])
+        return min(ready, key=lambda key: self._slots[key][0])
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            pose = self.make_pose()
+            initialised = time.perf_counter()
+            if self.warmup is not None:
+                self.warmup(pose)
+        except Exception as e:
+            print(f"{threading.current_thread().name} failed to start: {e}")
+            with self._cond:
+                if self.startup_error is None:
+                    self.startup_error = e
+                self._cond.notify_all()
+            return
+        timing = {"init_s": initialised - start, "first_inference_s": time.perf_counter() - initialised}
+        print(f"{threading.current_thread().name} ready: init {timing['init_s']:.2f} s, "
+              f"first inference {timing['first_inference_s']:.2f} s")
+        with self._cond:
+            self.startup.append(timing)
+            self._cond.notify_all()
+
+        while True:
+            with self._cond:
+                key = self._next()
+                while key is None and not self._stopped:
+                    self._cond.wait()
+                    key = self._next()
+                if self._stopped:
+                    return
+                job = self._slots.pop(key)[2]
+                self._busy.add(key)
+            try:
+                job(pose)
+            except Exception as e:
+                print(f"Inference for stream {key} failed: {e}")
+            finally:
+                with self._cond:
+                    self._busy.discard(key)
+                    self.completed += 1
+                    # This stream may have a frame waiting that no worker could take
+                    self._cond.notify_all()
+
+
+class CameraStream:
+    """
+    One upstream MJPEG feed: an ingest thread, its posture state and the hub
+    its viewers subscribe to.
+
+    The ingest thread demuxes and decodes frames (`decode(jpg)`, typically at
+    inference scale) and submits `process(stream, pose, jpg, frame)` to the
+    shared pool. It reconnects after `reconnect_delay` while the stream is
+    registered, whether or not anyone is watching, so alerts keep working.
+    """
+
+    def __init__(self, stream_id, url, pool, process, decode, motion_gate=None, roi_tracker=None,
+                 budget=1.0, read_size=16384, reconnect_delay=2.0, queue_size=2):
+        self.id = stream_id
+        self.url = url
+        self.pool = pool
+        self.process = process
+        self.decode = decode
+        self.motion_gate = motion_gate
+        self.roi_tracker = roi_tracker
+        self.budget = budget
+        self.read_size = read_size
+        self.reconnect_delay = reconnect_delay
+        self.hub = FrameHub(queue_size=queue_size)
+        # Posture state, only touched by the stream's (serialised) inference jobs
+        self.results = None
+        self.posture = None
+        self.frames = 0
+        self.reconnects = 0
+        self.connected = False
+        self._stop = threading.Event()
+        self._response = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._ingest, name=f"ingest-{self.id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.pool.discard(self.id)
+        response = self._response
+        if response is not None:
+            # Unblocks the ingest thread's socket read
+            response.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self.hub.close()
+
+    def describe(self):
+        return {"id": self.id, "url": self.url, "connected": self.connected, "posture": self.posture,
+                "frames": self.frames, "reconnects": self.reconnects,
+                "viewers": self.hub.subscriber_count, "dropped": self.hub.dropped}
+
+    def _job(self, jpg, frame):
+        def run(pose):
+            self.process(self, pose, jpg, frame)
+            self.frames += 1
+        return run
+
+    def _ingest(self):
+        while not self._stop.is_set():
+            try:
+                self._response = requests.get(self.url, stream=True, timeout=(5, 30))
+                if self._response.status_code != 200:
+                    print(f"Stream {self.id}: unable to access video feed ({self._response.status_code}).")
+                else:
+                    self.connected = True
+                    demuxer = MJPEGDemuxer(
+                        boundary=boundary_from_content_type(self._response.headers.get("Content-Type")),
+                        read_size=self.read_size)
+                    for jpg in demuxer.iter_frames(self._response.raw):
+                        if self._stop.is_set():
+                            break
+                        frame = self.decode(jpg)
+                        if frame is not None:
+                            # The demuxer's view is only valid until the next frame; the job runs later
+                            self.pool.submit(self.id, self._job(bytes(jpg), frame), self.budget)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"Stream {self.id} failed: {e}")
+            finally:
+                self.connected = False
+                if self._response is not None:
+                    self._response.close()
+                    self._response = None
+
+            if self._stop.wait(self.reconnect_delay):
+                return
+            self.reconnects += 1
+
+
+class StreamRegistry:
+    """The upstream feeds a server is watching, added and removed at runtime."""
+
+    def __init__(self, create_stream):
+        # create_stream(stream_id, url, **options) -> CameraStream (not yet started)
+        self.create_stream = create_stream
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._streams)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._streams.values()))
+
+    def get(self, stream_id):
+        return self._streams.get(stream_id)
+
+    def add(self, stream_id, url, **options):
+        """Start watching `url`. Returns the stream, or None if the id is taken."""
+        with self._lock:
+            if stream_id in self._streams:
+                return None
+            stream = self._streams[stream_id] = self.create_stream(stream_id, url, **options)
+        stream.start()
+        return stream
+
+    def remove(self, stream_id):
+        """Stop a stream and disconnect its viewers. Returns False if it was not registered."""
+        with self._lock:
+            stream = self._streams.pop(stream_id, None)
+        if stream is None:
+            return False
+        stream.stop()
+        return True
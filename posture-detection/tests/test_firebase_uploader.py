@@ -0,0 +1,110 @@
+import threading
+import time
+
+from firebase_uploader import StatusUploader
+
+
+class FakeFirebase:
+    """
+    Storage and Realtime Database stand-in. Calls fail while `online` is
+    False; while `uplink` is cleared, uploads block until it is set again.
+    """
+
+    def __init__(self):
+        self.online = True
+        self.uplink = threading.Event()
+        self.uplink.set()
+        self.uploading = threading.Event()
+        self.images = {}
+        self.statuses = []
+
+    def _connect(self):
+        if not self.online:
+            raise ConnectionError("no network")
+
+    def upload_image(self, name, jpeg_bytes):
+        self.uploading.set()
+        self.uplink.wait()
+        self._connect()
+        self.images[name] = bytes(jpeg_bytes)
+        return f"https://storage.example/{name}"
+
+    def update_status(self, status):
+        self._connect()
+        self.statuses.append(dict(status))
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_unchanged_status_is_not_resent():
+    firebase = FakeFirebase()
+    uploader = StatusUploader(firebase, backoff=0.01)
+    uploader.submit({"unsafe_sleeping": False}, encode_image=lambda: b"a")
+    uploader.flush(5)
+    uploader.submit({"unsafe_sleeping": False}, encode_image=lambda: b"b")
+    uploader.close()
+    assert firebase.statuses == [{"unsafe_sleeping": False, "image_url": "https://storage.example/test123.jpg"}]
+    assert firebase.images == {"test123.jpg": b"a"}
+
+
+def test_image_is_only_encoded_when_the_status_changes():
+    uploader = StatusUploader(FakeFirebase(), backoff=0.01)
+    encoded = []
+
+    def encode():
+        encoded.append(1)
+        return b"a"
+
+    assert uploader.submit({"unsafe_sleeping": True}, encode_image=encode)
+    assert not uploader.submit({"unsafe_sleeping": True}, encode_image=encode)
+    assert uploader.submit({"unsafe_sleeping": False}, encode_image=encode)
+    uploader.close()
+    assert len(encoded) == 2
+
+
+def test_only_the_latest_image_and_status_are_uploaded():
+    # Later states arrive while the first image is still going up
+    firebase = FakeFirebase()
+    firebase.uplink.clear()
+    uploader = StatusUploader(firebase, backoff=0.01)
+    uploader.submit({"state": 1}, encode_image=lambda: b"image 1")
+    assert firebase.uploading.wait(5)
+    for state in (2, 3, 4):
+        uploader.submit({"state": state}, encode_image=lambda: b"image %d" % state)
+    firebase.uplink.set()
+    uploader.close()
+    assert firebase.images == {"test123.jpg": b"image 4"}
+    assert [status["state"] for status in firebase.statuses] == [4]
+    assert uploader.stats["images_sent"] == 2
+    assert uploader.stats["images_coalesced"] == 2
+    assert uploader.stats["statuses_coalesced"] == 3
+
+
+def test_failed_uploads_are_retried():
+    firebase = FakeFirebase()
+    firebase.online = False
+    uploader = StatusUploader(firebase, max_retries=50, backoff=0.01, max_backoff=0.01)
+    uploader.submit({"unsafe_sleeping": True}, encode_image=lambda: b"a")
+    assert wait_for(lambda: uploader.stats["retries"] >= 2)
+    firebase.online = True
+    uploader.close()
+    assert firebase.images == {"test123.jpg": b"a"}
+    assert firebase.statuses == [{"unsafe_sleeping": True, "image_url": "https://storage.example/test123.jpg"}]
+    assert uploader.stats["failures"] == 0
+
+
+def test_status_is_kept_after_giving_up():
+    firebase = FakeFirebase()
+    firebase.online = False
+    uploader = StatusUploader(firebase, max_retries=1, backoff=0.01, max_backoff=0.01)
+    uploader.submit({"unsafe_sleeping": True})
+    # Each round of retries fails and the status goes back in the queue
+    assert wait_for(lambda: uploader.stats["failures"] >= 1)
+    firebase.online = True
+    uploader.close()
+    assert firebase.statuses == [{"unsafe_sleeping": True}]
@@ -0,0 +1,41 @@
+import socket
+
+from mjpeg_demuxer import MJPEGDemuxer, boundary_from_content_type
+
+JPEG = b"\xff\xd8" + b"\x00" * 100 + b"\xff\xd9"
+
+
+def part(data, length=True):
+    header = b"--frame\r\nContent-Type: image/jpeg\r\n"
+    if length:
+        header += b"Content-Length: %d\r\n" % len(data)
+    return header + b"\r\n" + data + b"\r\n"
+
+
+def test_boundary_from_content_type():
+    assert boundary_from_content_type("multipart/x-mixed-replace; boundary=frame") == "frame"
+    assert boundary_from_content_type('multipart/x-mixed-replace; boundary="--frame"') == "frame"
+    assert boundary_from_content_type("image/jpeg") is None
+
+
+def test_frames_split_across_chunks():
+    stream = part(JPEG) + part(JPEG, length=False) + part(JPEG)
+    demuxer = MJPEGDemuxer("frame")
+    frames = []
+    for i in range(0, len(stream), 7):
+        frames += [bytes(frame) for frame in demuxer.feed(stream[i:i + 7])]
+    assert frames == [JPEG] * 3
+
+
+def test_small_frame_is_not_held_for_a_full_read():
+    # A frame far smaller than read_size, with nothing after it yet
+    reader, writer = socket.socketpair()
+    reader.settimeout(5)
+    try:
+        writer.sendall(part(JPEG))
+        with reader.makefile("rb") as source:
+            frames = MJPEGDemuxer("frame", read_size=16384).iter_frames(source)
+            assert bytes(next(frames)) == JPEG
+    finally:
+        reader.close()
+        writer.close()
@@ -0,0 +1,160 @@
+import threading
+import time
+
+from notification_dispatcher import NotificationDispatcher
+
+
+class RecordingTransport:
+    """
+    Records (recipient, message) for every send. Errors queued in `errors`
+    are raised by the next sends, one each; while `line` is cleared, sends
+    wait for it.
+    """
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.line = threading.Event()
+        self.line.set()
+        self.sent = []
+
+    def send(self, recipient, message):
+        self.line.wait()
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((recipient, dict(message)))
+
+
+def states(transport):
+    return [(message["stream"], message["state"]) for _, message in transport.sent]
+
+
+def test_duplicate_states_are_dropped():
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher({"parent": transport}, coalesce_window=0.2, rate_per_minute=6000.0,
+                                        burst=100)
+    assert dispatcher.notify("crib", "tummy", "Tummy!")
+    assert not dispatcher.notify("crib", "tummy", "Tummy!")
+    assert dispatcher.flush(5)
+    assert not dispatcher.notify("crib", "tummy", "Tummy!")
+    dispatcher.close()
+    assert states(transport) == [("crib", "tummy")]
+    assert dispatcher.stats["duplicates"] == 2
+
+
+def test_changes_within_the_window_are_coalesced():
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher({"parent": transport}, coalesce_window=0.3, rate_per_minute=6000.0,
+                                        burst=100)
+    dispatcher.notify("crib", "tummy", "Tummy!")
+    dispatcher.flush(5)
+    dispatcher.notify("crib", "side", "Side!")
+    dispatcher.notify("crib", "normal", "Normal")
+    # Nothing more goes out until the window ends, then only the final state
+    time.sleep(0.1)
+    assert states(transport) == [("crib", "tummy")]
+    dispatcher.close()
+    assert states(transport) == [("crib", "tummy"), ("crib", "normal")]
+    assert transport.sent[-1][1]["coalesced"] == 1
+    assert dispatcher.stats["coalesced"] == 1
+
+
+def test_flip_back_within_the_window_sends_nothing():
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher({"parent": transport}, coalesce_window=0.3, rate_per_minute=6000.0,
+                                        burst=100)
+    dispatcher.notify("crib", "tummy", "Tummy!")
+    dispatcher.flush(5)
+    assert dispatcher.notify("crib", "side", "Side!")
+    assert not dispatcher.notify("crib", "tummy", "Tummy!")
+    dispatcher.close()
+    assert states(transport) == [("crib", "tummy")]
+
+
+def test_streams_are_independent():
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher({"parent": transport}, coalesce_window=0.2)
+    dispatcher.notify("nursery", "tummy", "Tummy!")
+    dispatcher.notify("bedroom", "tummy", "Tummy!")
+    dispatcher.close()
+    assert sorted(states(transport)) == [("bedroom", "tummy"), ("nursery", "tummy")]
+
+
+def test_token_bucket_limits_each_recipient():
+    # Two messages at once, then one every half second
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher({"parent": transport}, coalesce_window=0.2, rate_per_minute=120.0, burst=2)
+    start = time.monotonic()
+    for stream in ("a", "b", "c"):
+        dispatcher.notify(stream, "tummy", "Tummy!")
+    time.sleep(0.2)
+    assert len(transport.sent) == 2
+    assert dispatcher.flush(5)
+    assert len(transport.sent) == 3
+    assert time.monotonic() - start >= 0.4
+    dispatcher.close()
+
+
+def test_rate_limited_messages_keep_only_the_latest_state():
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher({"parent": transport}, coalesce_window=0.0, rate_per_minute=120.0, burst=1)
+    dispatcher.notify("other", "side", "Side!")
+    dispatcher.notify("crib", "tummy", "Tummy!")
+    # Let "tummy" reach the outbox, where it waits for a token
+    time.sleep(0.1)
+    dispatcher.notify("crib", "side", "Side!")
+    dispatcher.close()
+    assert states(transport) == [("other", "side"), ("crib", "side")]
+    assert dispatcher.stats["superseded"] == 1
+
+
+def test_queue_overflow_drops_the_oldest_stream():
+    transport = RecordingTransport()
+    dispatcher = NotificationDispatcher({"parent": transport}, queue_size=2, coalesce_window=0.3,
+                                        rate_per_minute=6000.0, burst=100)
+    for stream in ("a", "b", "c"):
+        dispatcher.notify(stream, "tummy", "Tummy!")
+        dispatcher.flush(5)
+    # All three now wait for their coalescing window, but only two fit
+    for stream in ("a", "b", "c"):
+        dispatcher.notify(stream, "side", "Side!")
+    dispatcher.close()
+    assert dispatcher.stats["dropped"] == 1
+    assert sorted(states(transport)[3:]) == [("b", "side"), ("c", "side")]
+
+
+def test_failed_sends_are_retried_with_backoff():
+    transport = RecordingTransport(errors=[ConnectionError("gateway timeout")] * 2)
+    dispatcher = NotificationDispatcher({"parent": transport}, backoff=0.05)
+    start = time.monotonic()
+    dispatcher.notify("crib", "tummy", "Tummy!")
+    dispatcher.close()
+    assert states(transport) == [("crib", "tummy")]
+    assert dispatcher.stats["retries"] == 2
+    # 0.05 s, then 0.1 s
+    assert time.monotonic() - start >= 0.15
+
+
+def test_gives_up_after_max_retries():
+    transport = RecordingTransport(errors=[ConnectionError("gateway timeout")] * 3)
+    dispatcher = NotificationDispatcher({"parent": transport}, max_retries=2, backoff=0.01)
+    dispatcher.notify("crib", "tummy", "Tummy!")
+    dispatcher.close()
+    assert transport.sent == []
+    assert dispatcher.stats["retries"] == 2
+    assert dispatcher.stats["failures"] == 1
+
+
+def test_slow_recipient_does_not_delay_the_others():
+    slow = RecordingTransport()
+    slow.line.clear()
+    fast = RecordingTransport()
+    dispatcher = NotificationDispatcher({"slow": slow, "fast": fast}, coalesce_window=0.0)
+    dispatcher.notify("crib", "tummy", "Tummy!")
+    deadline = time.monotonic() + 5
+    while not fast.sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(fast.sent) == 1
+    assert slow.sent == []
+    slow.line.set()
+    dispatcher.close()
+    assert len(slow.sent) == 1
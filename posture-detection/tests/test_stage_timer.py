@@ -0,0 +1,41 @@
+import threading
+
+from stage_timer import StageTimer
+
+
+def test_threads_share_one_timer():
+    timer = StageTimer(window=None, report_interval=0.01)
+    stop = threading.Event()
+
+    def pipeline():
+        for _ in range(2000):
+            timer.record("pose", 0.001)
+            timer.frame_done()
+
+    def reporter():
+        # The live pipelines print the table while frames are being recorded
+        while not stop.is_set():
+            timer.table()
+
+    threads = [threading.Thread(target=pipeline) for _ in range(4)]
+    watcher = threading.Thread(target=reporter)
+    watcher.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    watcher.join()
+    assert timer.frames == 8000
+    assert timer.stats()["pose"]["count"] == 8000
+
+
+def test_stats_in_pipeline_order():
+    timer = StageTimer()
+    for name in ("pose", "glass_to_alert", "capture"):
+        timer.record(name, 0.002)
+    timer.frame_done()
+    assert list(timer.stats()) == ["capture", "pose", "glass_to_alert"]
+    assert timer.table().splitlines()[-1].startswith("1 frames")
+    timer.reset()
+    assert timer.stats() == {} and timer.frames == 0
@@ -0,0 +1,221 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from stream_registry import CameraStream, InferencePool, StreamRegistry
+
+# Frames served on each path, once: later connections get none. None keeps sending until the server stops.
+FEED_FRAMES = {"/fast": 60, "/mid": 20, "/slow": 5, "/live": None}
+# Pause between frames of the endless feed
+LIVE_INTERVAL = 0.02
+
+
+def jpeg(index):
+    # Stand-in JPEG numbered `index`: the demuxer only needs the part headers and SOI/EOI markers
+    return b"\xff\xd8" + b"%08d" % index + b"\x00" * 256 + b"\xff\xd9"
+
+
+def wait_for(predicate, timeout=10.0):
+    """Poll until `predicate()` is true; the timeout only guards against a hang."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class MJPEGHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path not in FEED_FRAMES:
+            self.send_error(404)
+            return
+        count = FEED_FRAMES[self.path]
+        if count is not None:
+            with self.server.lock:
+                if self.path in self.server.served:
+                    # A reconnect after the feed ended
+                    count = 0
+                self.server.served.add(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.end_headers()
+        try:
+            index = 0
+            # The response ends after the last frame (HTTP/1.0), so the ingest thread is not left in a read
+            while not self.server.stopping.is_set() and index != count:
+                frame = jpeg(index)
+                self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n"
+                                 b"Content-Length: %d\r\n\r\n" % len(frame) + frame + b"\r\n")
+                index += 1
+                if count is None:
+                    time.sleep(LIVE_INTERVAL)
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def mjpeg_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MJPEGHandler)
+    server.daemon_threads = True
+    server.stopping = threading.Event()
+    server.lock = threading.Lock()
+    server.served = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.stopping.set()
+    server.shutdown()
+    server.server_close()
+
+
+class Recorder:
+    """process() stand-in: a fixed inference cost, and a check that no stream runs twice at once."""
+
+    def __init__(self, cost=0.0):
+        self.cost = cost
+        self.done = {}
+        self.last = {}
+        self.overlaps = 0
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, stream, pose, jpg, frame):
+        with self._lock:
+            if stream.id in self._running:
+                self.overlaps += 1
+            self._running.add(stream.id)
+        time.sleep(self.cost)
+        with self._lock:
+            self._running.discard(stream.id)
+            self.done[stream.id] = self.done.get(stream.id, 0) + 1
+            self.last[stream.id] = jpg
+
+
+def make_registry(pool, process):
+    def create_stream(stream_id, url):
+        # Small reads: the stand-in frames are far smaller than a camera's
+        return CameraStream(stream_id, url, pool, process, decode=bytes, read_size=256, reconnect_delay=0.1)
+    return StreamRegistry(create_stream)
+
+
+def test_pool_slot_keeps_only_the_newest_frame():
+    pool = InferencePool(lambda: None, workers=1)
+    ran = []
+    pool.submit("a", lambda pose: ran.append(1))
+    pool.submit("a", lambda pose: ran.append(2))
+    assert pool.pending == 1
+    assert pool.dropped == 1
+    pool.start()
+    assert wait_for(lambda: pool.completed == 1)
+    pool.stop()
+    assert ran == [2]
+
+
+@pytest.mark.parametrize("policy, expected", [("round_robin", "first"), ("deadline", "urgent")])
+def test_pool_policy_picks_next_stream(policy, expected):
+    pool = InferencePool(lambda: None, workers=1, policy=policy)
+    pool.submit("first", lambda pose: None, budget=5.0)
+    pool.submit("urgent", lambda pose: None, budget=0.1)
+    assert pool._next() == expected
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        InferencePool(lambda: None, policy="fifo")
+
+
+def test_round_robin_serves_every_waiting_stream():
+    # The fast stream always has a new frame waiting by the time its job ends
+    pool = InferencePool(lambda: None, workers=1)
+    order = []
+
+    def fast(pose):
+        order.append("fast")
+        if len(order) < 10:
+            pool.submit("fast", fast)
+
+    def other(name):
+        return lambda pose: order.append(name)
+
+    pool.submit("fast", fast)
+    pool.submit("slow", other("slow"))
+    pool.submit("mid", other("mid"))
+    pool.start()
+    assert wait_for(lambda: pool.completed == 10)
+    pool.stop()
+    assert order[:3] == ["fast", "slow", "mid"]
+    assert order.count("fast") == 8
+
+
+def test_pool_reports_a_worker_that_failed_to_start():
+    def make_pose():
+        raise RuntimeError("no model")
+
+    pool = InferencePool(make_pose, workers=2)
+    pool.start()
+    assert not pool.wait_ready(5)
+    assert not pool.ready
+    assert str(pool.startup_error) == "no model"
+    pool.stop()
+
+
+def test_every_frame_is_processed_or_replaced(mjpeg_server):
+    # One worker cannot keep up with the fast feed's burst, so its slot drops frames
+    process = Recorder(cost=0.005)
+    pool = InferencePool(lambda: None, workers=1)
+    pool.start()
+    registry = make_registry(pool, process)
+    base = f"http://127.0.0.1:{mjpeg_server.server_port}"
+    names = ("fast", "mid", "slow")
+    for name in names:
+        registry.add(name, f"{base}/{name}")
+
+    # A stream's newest frame is never replaced, so each feed ends on its last frame
+    finished = wait_for(lambda: all(process.last.get(name) == jpeg(FEED_FRAMES[f"/{name}"] - 1)
+                                    for name in names))
+    for stream in list(registry):
+        registry.remove(stream.id)
+    pool.stop()
+
+    assert finished
+    assert process.overlaps == 0
+    assert pool.completed + pool.dropped == sum(FEED_FRAMES[f"/{name}"] for name in names)
+    assert sum(process.done.values()) == pool.completed
+
+
+def test_add_and_remove_streams(mjpeg_server):
+    process = Recorder()
+    pool = InferencePool(lambda: None, workers=2)
+    pool.start()
+    registry = make_registry(pool, process)
+    base = f"http://127.0.0.1:{mjpeg_server.server_port}"
+
+    first = registry.add("a", f"{base}/live")
+    assert first is not None
+    assert registry.add("a", f"{base}/slow") is None
+    second = registry.add("b", f"{base}/live")
+    assert len(registry) == 2
+    assert registry.get("b") is second
+
+    assert wait_for(lambda: first.frames > 0 and second.frames > 0)
+    assert first.connected
+    assert registry.remove("a")
+    assert not registry.remove("a")
+    assert registry.get("a") is None
+    assert not first._thread.is_alive()
+
+    # A removed stream gets no more work while the others keep going
+    frames = first.frames
+    seen = second.frames
+    assert wait_for(lambda: second.frames >= seen + 5)
+    # Only a job that was already running when the stream was removed may still finish
+    assert first.frames <= frames + 1
+    assert [stream.id for stream in registry] == ["b"]
+
+    registry.remove("b")
+    pool.stop()
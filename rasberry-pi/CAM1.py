@@ -2,35 +2,73 @@ from picamzero import Camera
 from io import BytesIO
 from PIL import Image
 import asyncio
+import time
 import websockets
+from frame_broadcaster import FrameBroadcaster
+
+TARGET_FPS = 30
+# Seconds between fps reports
+FPS_REPORT_INTERVAL = 5.0
 
 # Initialize the camera
 cam = Camera()
 
-async def send_frames(websocket, path):
+# One capture task feeds every connected client
+broadcaster = FrameBroadcaster()
+
+# Capture a frame and convert it to JPEG bytes (runs in an executor thread)
+def capture_jpeg():
+    frame = cam.capture_image()
+    with BytesIO() as output:
+        frame.save(output, format="JPEG")
+        return output.getvalue()
+
+async def capture_frames():
+    loop = asyncio.get_running_loop()
+    period = 1 / TARGET_FPS
+    deadline = loop.time()
+    frames = 0
+    report_start = time.monotonic()
+
+    while True:
+        if broadcaster.clients == 0:
+            # Nobody is watching; don't keep the camera and encoder busy
+            await asyncio.sleep(0.1)
+            deadline = loop.time()
+            continue
+
+        # Capture and encode off the event loop
+        frame_data = await loop.run_in_executor(None, capture_jpeg)
+        broadcaster.publish_message(frame_data)
+        frames += 1
+
+        elapsed = time.monotonic() - report_start
+        if elapsed >= FPS_REPORT_INTERVAL:
+            print(f"Streaming at {frames / elapsed:.1f} fps to {broadcaster.clients} client(s), "
+                  f"{broadcaster.skipped} frames skipped for slow clients")
+            frames = 0
+            report_start = time.monotonic()
+
+        # Sleep until the next frame deadline rather than a fixed 1/30 s
+        deadline += period
+        delay = deadline - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # Running behind; start a new schedule instead of bursting to catch up
+            deadline = loop.time()
+
+async def send_frames(websocket, path=None):
+    await broadcaster.serve(websocket)
+    print("Client disconnected")
+
+# Start WebSocket server
+async def main():
     cam.start_preview()  # Starts the camera preview
     try:
-        while True:
-            # Capture frame
-            frame = cam.capture_image()
-           
-            # Convert to bytes
-            with BytesIO() as output:
-                frame.save(output, format="JPEG")
-                frame_data = output.getvalue()
-           
-            # Send frame over WebSocket
-            await websocket.send(frame_data)
-           
-            # Limit frame rate
-            await asyncio.sleep(1 / 30)  # 30 FPS
-    except websockets.exceptions.ConnectionClosed:
-        print("Client disconnected")
+        async with websockets.serve(send_frames, "0.0.0.0", 8000):
+            await capture_frames()
     finally:
         cam.stop_preview()
 
-# Start WebSocket server
-start_server = websockets.serve(send_frames, "0.0.0.0", 8000)
-
-asyncio.get_event_loop().run_until_complete(start_server)
-asyncio.get_event_loop().run_forever()
+asyncio.run(main())
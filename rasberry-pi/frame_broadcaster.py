@@ -0,0 +1,70 @@
+import asyncio
+import json
+import struct
+import time
+
+import websockets
+
+
+def pack_frame(header, jpeg_bytes):
+    """
+    Binary frame message: 4-byte big-endian header length, UTF-8 JSON header,
+    then the raw JPEG.
+    """
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return struct.pack(">I", len(header_bytes)) + header_bytes + jpeg_bytes
+
+
+class FrameBroadcaster:
+    """
+    Push-based frame fan-out for WebSocket clients.
+
+    Each frame is serialised once in publish(). Client tasks sleep on an
+    asyncio event until a new frame arrives and always send the newest one,
+    so a slow connection skips frames instead of queueing them.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._message = None
+        self._seq = 0
+        self._changed = asyncio.Event()
+        self.clients = 0
+        self.skipped = 0
+
+    def bind(self, loop):
+        """Remember the event loop so other threads can publish."""
+        self._loop = loop
+
+    def publish_threadsafe(self, jpeg_bytes, result):
+        self._loop.call_soon_threadsafe(self.publish, jpeg_bytes, result)
+
+    def publish(self, jpeg_bytes, result):
+        self.publish_message(pack_frame({"seq": self._seq + 1, "result": result, "time": time.time()},
+                                        jpeg_bytes))
+
+    def publish_message(self, message):
+        """Publish an already-serialised message (e.g. a bare JPEG)."""
+        self._seq += 1
+        self._message = message
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def serve(self, websocket):
+        """Send frames to one client until it disconnects."""
+        self.clients += 1
+        sent_seq = 0
+        try:
+            while True:
+                if self._seq == sent_seq:
+                    await self._changed.wait()
+                    continue
+                if sent_seq:
+                    self.skipped += self._seq - sent_seq - 1
+                sent_seq = self._seq
+                # Waits for the socket to drain; frames published meanwhile are skipped
+                await websocket.send(self._message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.clients -= 1
@@ -0,0 +1,238 @@
+import json
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from websockets.sync.client import connect
+
+
+class InferenceClient:
+    """
+    Pipelined client for the remote /process-frame/ API.
+
+    Requests go through one keep-alive requests.Session (no TLS handshake per
+    frame), with up to `max_in_flight` frames outstanding so capture and
+    network overlap. submit() only blocks when all slots are busy.
+    `on_result(seq, jpeg_bytes, result)` is called from a worker thread, and
+    results may arrive out of order. `camera_id` is sent as X-Camera-Id so
+    the server can cache results per camera.
+    """
+
+    def __init__(self, url, on_result, max_in_flight=3, timeout=10.0, camera_id=None):
+        self.url = url
+        self.on_result = on_result
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.session = requests.Session()
+        if camera_id:
+            self.session.headers["X-Camera-Id"] = camera_id
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        # Exponentially weighted round-trip time in seconds
+        self.rtt = None
+
+    def submit(self, seq, jpeg_bytes):
+        self._slots.acquire()
+        self._executor.submit(self._post, seq, jpeg_bytes)
+
+    def capture_interval(self, min_interval, max_interval):
+        """Seconds between captures that keeps the pipeline full but not queued."""
+        if self.rtt is None:
+            return max_interval
+        return min(max_interval, max(min_interval, self.rtt / self.max_in_flight))
+
+    def _post_frame(self, url, jpeg_bytes):
+        try:
+            files = {'file': ('image.jpg', jpeg_bytes, 'image/jpeg')}
+            response = self.session.post(url, files=files, timeout=self.timeout)
+            if response.status_code == 200:
+                return response.json().get("alert", "No alert received")
+            return f"Error: {response.status_code}"
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def _record_rtt(self, started):
+        elapsed = time.monotonic() - started
+        self.rtt = elapsed if self.rtt is None else 0.8 * self.rtt + 0.2 * elapsed
+
+    def _post(self, seq, jpeg_bytes):
+        started = time.monotonic()
+        try:
+            result = self._post_frame(self.url, jpeg_bytes)
+        finally:
+            self._slots.release()
+
+        self._record_rtt(started)
+        self.on_result(seq, jpeg_bytes, result)
+
+
+class LandmarkInferenceClient(InferenceClient):
+    """
+    Client for the remote /process-landmark/ API, for Pis that run pose
+    themselves.
+
+    Each frame uploads only its packed landmarks (528 bytes instead of a
+    JPEG). When the verdict turns unsafe, the JPEG of that frame is also
+    sent to `frame_url` (/process-frame/) so the server checks it with its
+    own model; that verdict is the one reported. `on_result` is called as
+    for InferenceClient.
+    """
+
+    def __init__(self, url, frame_url, on_result, max_in_flight=3, timeout=10.0, camera_id=None):
+        super().__init__(url, on_result, max_in_flight=max_in_flight, timeout=timeout, camera_id=camera_id)
+        self.frame_url = frame_url
+        self._unsafe = False
+        self._state_lock = threading.Lock()
+        # Uploads so far, for checking the bandwidth saving
+        self.landmarks_sent = 0
+        self.frames_sent = 0
+
+    def submit(self, seq, jpeg_bytes, landmark_bytes):
+        self._slots.acquire()
+        self._executor.submit(self._post_landmarks, seq, jpeg_bytes, landmark_bytes)
+
+    def _post_landmarks(self, seq, jpeg_bytes, landmark_bytes):
+        started = time.monotonic()
+        try:
+            unsafe = None
+            try:
+                response = self.session.post(self.url, data=landmark_bytes, timeout=self.timeout,
+                                             headers={"Content-Type": "application/octet-stream"})
+                self.landmarks_sent += 1
+                if response.status_code == 200:
+                    reply = response.json()
+                    result = reply.get("alert", "No alert received")
+                    unsafe = reply.get("unsafe", False)
+                else:
+                    result = f"Error: {response.status_code}"
+            except Exception as e:
+                result = f"Error: {str(e)}"
+            self._record_rtt(started)
+
+            if unsafe is not None:
+                with self._state_lock:
+                    fired = unsafe and not self._unsafe
+                    self._unsafe = unsafe
+                if fired:
+                    # Alert just fired: back it with the full frame
+                    result = self._post_frame(self.frame_url, jpeg_bytes)
+                    self.frames_sent += 1
+        finally:
+            self._slots.release()
+
+        self.on_result(seq, jpeg_bytes, result)
+
+
+class StreamingInferenceClient:
+    """
+    Client for the remote /ws/process-frames endpoint, with the same
+    interface as InferenceClient.
+
+    Every frame goes over one persistent WebSocket as a 4-byte sequence
+    number plus the JPEG, so there is no HTTP request or multipart body per
+    frame. Up to `max_in_flight` frames (or fewer, if the server says so) are
+    outstanding and results come back as soon as each is ready, in any
+    order. If the connection drops, outstanding frames get an error result
+    and the next submit() reconnects.
+    """
+
+    def __init__(self, url, on_result, max_in_flight=3, timeout=10.0, camera_id=None):
+        self.url = url
+        self.on_result = on_result
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.camera_id = camera_id
+        self.window = max_in_flight
+        self._ws = None
+        # seq -> (jpeg_bytes, sent_at) for frames awaiting a result
+        self._pending = {}
+        self._cond = threading.Condition()
+        # Exponentially weighted round-trip time in seconds
+        self.rtt = None
+
+    def submit(self, seq, jpeg_bytes):
+        with self._cond:
+            while self._ws is not None and len(self._pending) >= self.window:
+                self._cond.wait()
+            error = None
+            if self._ws is None:
+                try:
+                    self._connect()
+                except Exception as e:
+                    error = f"Error: {str(e)}"
+            ws = self._ws
+            if error is None:
+                self._pending[seq] = (jpeg_bytes, time.monotonic())
+
+        if error is not None:
+            self.on_result(seq, jpeg_bytes, error)
+            return
+        try:
+            ws.send(struct.pack(">I", seq) + jpeg_bytes)
+        except Exception as e:
+            self._fail(ws, e)
+
+    def capture_interval(self, min_interval, max_interval):
+        """Seconds between captures that keeps the pipeline full but not queued."""
+        if self.rtt is None:
+            return max_interval
+        return min(max_interval, max(min_interval, self.rtt / self.window))
+
+    def _connect(self):
+        query = {"max_in_flight": self.max_in_flight}
+        if self.camera_id:
+            query["camera"] = self.camera_id
+        ws = connect(f"{self.url}?{urlencode(query)}", open_timeout=self.timeout,
+                     max_size=None)
+        hello = json.loads(ws.recv(timeout=self.timeout))
+        self.window = max(1, min(self.max_in_flight, hello.get("max_in_flight", self.max_in_flight)))
+        self._ws = ws
+        threading.Thread(target=self._receive, args=(ws,), daemon=True).start()
+
+    def _receive(self, ws):
+        try:
+            while True:
+                try:
+                    message = ws.recv(timeout=self.timeout)
+                except TimeoutError:
+                    with self._cond:
+                        oldest = min((sent for _, sent in self._pending.values()), default=None)
+                    if oldest is not None and time.monotonic() - oldest > self.timeout:
+                        raise TimeoutError("no result within timeout")
+                    continue
+
+                reply = json.loads(message)
+                with self._cond:
+                    entry = self._pending.pop(reply.get("seq"), None)
+                    self._cond.notify_all()
+                if entry is None:
+                    continue
+                jpeg_bytes, sent_at = entry
+                elapsed = time.monotonic() - sent_at
+                self.rtt = elapsed if self.rtt is None else 0.8 * self.rtt + 0.2 * elapsed
+                if "alert" in reply:
+                    result = reply["alert"]
+                else:
+                    result = f"Error: {reply.get('error')}"
+                self.on_result(reply["seq"], jpeg_bytes, result)
+        except Exception as e:
+            self._fail(ws, e)
+
+    def _fail(self, ws, error):
+        with self._cond:
+            if self._ws is not ws:
+                # Already handled by the other side of this connection
+                return
+            self._ws = None
+            failed, self._pending = self._pending, {}
+            self._cond.notify_all()
+        ws.close()
+        for seq, (jpeg_bytes, _) in sorted(failed.items()):
+            self.on_result(seq, jpeg_bytes, f"Error: {str(error)}")
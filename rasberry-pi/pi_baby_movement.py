@@ -1,33 +1,24 @@
 import cv2
 import mediapipe as mp
 from picamzero import Camera
+import os
+import sys
+
+# Shared posture checks live in posture-detection/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "posture-detection"))
+from posture_classifier import PostureClassifier
+from motion_gate import MotionGate
+from roi_tracker import RoiTracker
+from inference_profiles import create_pose, load_profile
+from stage_timer import StageTimer
+from live_pipeline import DisplaySink, LivePipeline, VideoFileSink
 
 # Initialize Mediapipe pose and drawing classes
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
 
-# Function to check for tummy sleeping using alignment of shoulders and head
-def is_tummy_sleeping(pose_landmarks):
-    nose = pose_landmarks.landmark[mp_pose.PoseLandmark.NOSE]
-    left_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER]
-    right_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_SHOULDER]
-    
-    shoulder_mid_x = (left_shoulder.x + right_shoulder.x) / 2
-    is_face_down = abs(nose.x - shoulder_mid_x) < 0.05
-    
-    if is_face_down and nose.y > left_shoulder.y and nose.y > right_shoulder.y:
-        return True
-    return False
-
-# Function to check if the baby is sleeping sideways based on eye proximity
-def is_side_sleeping(pose_landmarks):
-    left_eye = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_EYE]
-    right_eye = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_EYE]
-    
-    eye_distance = abs(left_eye.x - right_eye.x)
-    if eye_distance < 0.02:
-        return True
-    return False
+# Posture checks shared with the other detection scripts
+classifier = PostureClassifier("pi")
 
 # Initialize the PicamZero camera
 cam = Camera()
@@ -36,39 +27,75 @@ cam = Camera()
 # cam.start_preview()
 
 # Initialize Mediapipe Pose object
-pose = mp_pose.Pose()
+# Pose settings for this device; override with INFERENCE_PROFILE
+profile_name, profile = load_profile("pi4")
+print(f"Inference profile: {profile_name}")
+pose = create_pose(profile)
 
-try:
-    while True:
-        # Get the current frame as a NumPy array
-        frame = cam.frame  # Provides the current camera frame as an RGB array
+# Skip pose inference while the crib scene is still (camera frames are RGB)
+motion_gate = MotionGate(max_interval=10.0, rgb=True, report_interval=60.0)
+results = None
+
+# Run pose on a crop around the baby; set a crib rectangle (x0, y0, x1, y1) in pixels to limit it
+CRIB_RECT = None
+roi_tracker = RoiTracker(crib_rect=CRIB_RECT, max_side=profile["max_side"],
+                         reset_on_move=not profile["static_image_mode"])
+
+# Per-stage and glass-to-alert latency, printed every minute
+timer = StageTimer(report_interval=60.0)
+
+# cam.frame returns the current frame immediately, so pace the capture thread
+CAPTURE_FPS = 15
+
+# Set a path to also record the annotated feed
+RECORD_PATH = None
 
-        # Convert frame from RGB to BGR (OpenCV expects BGR format)
-        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
 
-        # Process the frame with Mediapipe
-        results = pose.process(frame)
+def capture():
+    # Get the current frame as a NumPy array
+    return cam.frame  # Provides the current camera frame as an RGB array
 
-        if results.pose_landmarks:
-            # Draw pose landmarks on the frame
-            mp_drawing.draw_landmarks(frame_bgr, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
 
-            # Check for unsafe sleeping patterns
-            if is_tummy_sleeping(results.pose_landmarks):
-                cv2.putText(frame_bgr, 'Alert: Baby is sleeping on tummy!', (50, 50),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-            elif is_side_sleeping(results.pose_landmarks):
-                cv2.putText(frame_bgr, 'Alert: Baby is sleeping on side!', (50, 100),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+def infer(frame):
+    global results
+    # Process the frame with Mediapipe, reusing the last result while nothing moves
+    if motion_gate.should_infer(frame):
+        # Frames are already RGB; landmarks are mapped back to the full frame
+        results = roi_tracker.process(pose, frame, rgb=True, timer=timer)
 
-        # Display the frame with landmarks and alerts
-        cv2.imshow('Baby Movement Detection', frame_bgr)
+    # Check for unsafe sleeping patterns
+    with timer.stage("classify"):
+        posture = classifier.classify(results.pose_landmarks)
+    return results, posture
 
-        # Exit the loop if 'q' is pressed
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
 
+def annotate(packet):
+    # Convert frame from RGB to BGR (OpenCV expects BGR format)
+    frame_bgr = cv2.cvtColor(packet.frame, cv2.COLOR_RGB2BGR)
+
+    if packet.results.pose_landmarks:
+        # Draw pose landmarks on the frame
+        mp_drawing.draw_landmarks(frame_bgr, packet.results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+
+        if packet.posture == "tummy":
+            cv2.putText(frame_bgr, 'Alert: Baby is sleeping on tummy!', (50, 50),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+        elif packet.posture == "side":
+            cv2.putText(frame_bgr, 'Alert: Baby is sleeping on side!', (50, 100),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+    return frame_bgr
+
+
+# Display the frame with landmarks and alerts; press 'q' to quit
+sinks = [DisplaySink('Baby Movement Detection')]
+if RECORD_PATH:
+    sinks.append(VideoFileSink(RECORD_PATH, fps=CAPTURE_FPS))
+
+# Capture, inference and display each run on their own thread
+pipeline = LivePipeline(capture, infer, sinks=sinks, annotate=annotate, timer=timer, max_fps=CAPTURE_FPS)
+try:
+    pipeline.run()
 finally:
+    print(motion_gate.summary())
     # Stop the camera preview and release resources
     cam.stop_preview()
-    cv2.destroyAllWindows()
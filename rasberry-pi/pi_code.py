@@ -6,6 +6,8 @@ from MLX90614 import MLX90614
 import RPi.GPIO as GPIO
 import firebase_admin
 from firebase_admin import credentials, firestore
+from telemetry_writer import FirestoreBackend, TelemetryWriter
+from sensor_series import SensorSeries
 
 # Initialize GPIO
 GPIO.setwarnings(True)
@@ -16,44 +18,41 @@ cred = credentials.Certificate('/home/pi/MINI_PROJECT/babysphere-3d697-firebase-
 firebase_admin.initialize_app(cred)
 db = firestore.client()
 
-# Shared data variables with initial values
-sensor_data = {
-    "temperature": None,
-    "humidity": None,
-    "baby_temperature": None,
-    "ambient_temperature": None,
-    "heart_rate": None,
-    "spo2": None
+# Readings are spooled on the SD card and sent to Firestore in batches
+telemetry = TelemetryWriter(FirestoreBackend(db),
+                            spool_path='/home/pi/MINI_PROJECT/telemetry_spool.db',
+                            batch_size=10, flush_interval=60)
+
+# Per-sensor ring buffers: fixed memory, every reading kept for the longest window
+series = SensorSeries(["temperature", "humidity", "baby_temperature",
+                       "ambient_temperature", "heart_rate", "spo2"], capacity=1024)
+
+# Aggregation window (seconds) -> Firestore collection it is uploaded to
+AGGREGATE_WINDOWS = {
+    60: 'sensor_data',
+    900: 'sensor_data_15m',
 }
 
 # Lock for thread-safe access to shared data
 data_lock = threading.Lock()
 
 def send_to_firebase():
+    next_upload = {window: time.time() + window for window in AGGREGATE_WINDOWS}
     while True:
-        with data_lock:
-            # Check if all sensor data is available
-            if all(value is not None for value in sensor_data.values()):
-                timestamp = datetime.datetime.now()
-                try:
-                    # Add all sensor data to Firebase
-                    db.collection('sensor_data').add({
-                        'temperature': sensor_data["temperature"],
-                        'humidity': sensor_data["humidity"],
-                        'baby_temperature': sensor_data["baby_temperature"],
-                        'ambient_temperature': sensor_data["ambient_temperature"],
-                        'heart_rate': sensor_data["heart_rate"],
-                        'spo2': sensor_data["spo2"],
-                        'timestamp': timestamp
-                    })
-                    print(f"{timestamp} - Data successfully sent to Firestore: {sensor_data}")
-                except Exception as e:
-                    print(f"Failed to store data in Firestore: {e}")
-                finally:
-                    # Reset shared data to prepare for the next batch
-                    for key in sensor_data:
-                        sensor_data[key] = None
-        time.sleep(5)
+        now = time.time()
+        for window, collection in AGGREGATE_WINDOWS.items():
+            if now < next_upload[window]:
+                continue
+            next_upload[window] += window
+            # Aggregate under the lock, spool after releasing it
+            with data_lock:
+                record = series.aggregate(window, now)
+            if record is not None:
+                telemetry.append(collection, record)
+                print(f"{record['timestamp']} - {window} s aggregate spooled for Firestore "
+                      f"({telemetry.queue_depth} pending, "
+                      f"last flush {telemetry.stats['last_flush_ms'] or 0:.0f} ms)")
+        time.sleep(1)
 
 def generate_random_dht22_values():
     temperature = random.uniform(29, 35)
@@ -64,8 +63,8 @@ def read_dht22():
     while True:
         temperature, humidity = generate_random_dht22_values()
         with data_lock:
-            sensor_data["temperature"] = temperature
-            sensor_data["humidity"] = humidity
+            series.append("temperature", temperature)
+            series.append("humidity", humidity)
         timestamp = datetime.datetime.now()
         print(f"{timestamp} - DHT22 - Temperature: {temperature:.1f} C | Humidity: {humidity:.1f}%")
         time.sleep(5)
@@ -77,8 +76,8 @@ def read_mlx90614():
             baby_temp = sensor.readObjectTemperature()
             ambient_temp = sensor.readAmbientTemperature()
             with data_lock:
-                sensor_data["baby_temperature"] = baby_temp
-                sensor_data["ambient_temperature"] = ambient_temp
+                series.append("baby_temperature", baby_temp)
+                series.append("ambient_temperature", ambient_temp)
             timestamp = datetime.datetime.now()
             print(f"{timestamp} - MLX90614 - Baby Temp: {baby_temp:.1f} C | Ambient Temp: {ambient_temp:.1f} C")
         except Exception as e:
@@ -97,8 +96,8 @@ def read_max30102():
             heart_rate = generate_random_heart_rate()
             spo2 = generate_random_spo2()
             with data_lock:
-                sensor_data["heart_rate"] = heart_rate
-                sensor_data["spo2"] = spo2
+                series.append("heart_rate", heart_rate)
+                series.append("spo2", spo2)
             timestamp = datetime.datetime.now()
             print(f"{timestamp} - MAX30102 - Heart Rate: {heart_rate:.1f} bpm | SpO2: {spo2:.1f}%")
         except Exception as e:
@@ -0,0 +1,93 @@
+import datetime
+import time
+from array import array
+
+
+class RingBuffer:
+    """
+    Fixed-size time series of (timestamp, value) pairs backed by array('d').
+    Memory use is 16 bytes per slot no matter how long the Pi runs; once full,
+    the oldest sample is overwritten.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._values = array('d', bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value, timestamp=None):
+        self._times[self._next] = time.time() if timestamp is None else timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def window(self, seconds, now=None):
+        """
+        Return min, max, mean, last and count of the samples from the last
+        `seconds`, or None if there are none.
+        """
+        cutoff = (time.time() if now is None else now) - seconds
+        count = 0
+        total = 0.0
+        low = high = last = None
+        # Walk back from the newest sample until we leave the window
+        i = self._next
+        for _ in range(self._count):
+            i = (i - 1) % self.capacity
+            if self._times[i] < cutoff:
+                break
+            value = self._values[i]
+            if last is None:
+                last = low = high = value
+            elif value < low:
+                low = value
+            elif value > high:
+                high = value
+            total += value
+            count += 1
+        if not count:
+            return None
+        return {"min": low, "max": high, "mean": total / count, "last": last, "count": count}
+
+
+class SensorSeries:
+    """
+    One RingBuffer per sensor plus windowed aggregation for upload.
+    Not thread-safe on its own; callers share it under their data lock.
+    """
+
+    def __init__(self, names, capacity=1024):
+        self.buffers = {name: RingBuffer(capacity) for name in names}
+
+    def append(self, name, value, timestamp=None):
+        self.buffers[name].append(value, timestamp)
+
+    def aggregate(self, seconds, now=None):
+        """
+        Build one upload record for the last `seconds`. Each sensor's mean is
+        stored under its plain name (so existing readers keep working) with
+        _min, _max and _last alongside. Returns None if no sensor has data.
+        """
+        now = time.time() if now is None else now
+        record = {}
+        samples = 0
+        for name, buffer in self.buffers.items():
+            stats = buffer.window(seconds, now)
+            if stats is None:
+                continue
+            record[name] = stats["mean"]
+            record[f"{name}_min"] = stats["min"]
+            record[f"{name}_max"] = stats["max"]
+            record[f"{name}_last"] = stats["last"]
+            samples += stats["count"]
+        if not record:
+            return None
+        record["window_seconds"] = seconds
+        record["samples"] = samples
+        record["timestamp"] = datetime.datetime.fromtimestamp(now)
+        return record
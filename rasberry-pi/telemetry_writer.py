@@ -0,0 +1,135 @@
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Shared helpers live in posture-detection/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "posture-detection"))
+from backoff import Backoff
+
+# Firestore rejects batches with more than 500 writes
+FIRESTORE_MAX_BATCH = 500
+
+
+class FirestoreBackend:
+    """Writes spooled records to Firestore as batch writes."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def write_batch(self, collection, records):
+        batch = self.db.batch()
+        ref = self.db.collection(collection)
+        for record in records:
+            batch.set(ref.document(), record)
+        batch.commit()
+
+
+class TelemetryWriter:
+    """
+    Offline-tolerant telemetry writer.
+
+    append() only writes to a local SQLite spool (WAL, fsync on commit), so it
+    is fast and survives power loss. A background thread sends the oldest
+    spooled records to the backend in batches of `batch_size` and deletes them
+    once the write succeeds; failed flushes back off and keep the data.
+    """
+
+    def __init__(self, backend, spool_path="telemetry_spool.db", batch_size=50,
+                 flush_interval=5.0, max_backoff=300.0):
+        self.backend = backend
+        self.batch_size = min(batch_size, FIRESTORE_MAX_BATCH)
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(spool_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS spool ("
+                           "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                           "collection TEXT NOT NULL, "
+                           "ts REAL NOT NULL, "
+                           "payload TEXT NOT NULL)")
+        self._conn.commit()
+        self._pending = self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.stats = {"appended": 0, "flushed": 0, "failed_flushes": 0,
+                      "last_flush_ms": None, "max_flush_ms": 0.0}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        """Records spooled but not yet written to the backend."""
+        return self._pending
+
+    def append(self, collection, record):
+        """Spool one record. A `timestamp` datetime field is kept as-is for Firestore."""
+        record = dict(record)
+        timestamp = record.pop("timestamp", None) or datetime.datetime.now()
+        with self._lock:
+            self._conn.execute("INSERT INTO spool (collection, ts, payload) VALUES (?, ?, ?)",
+                               (collection, timestamp.timestamp(), json.dumps(record)))
+            self._conn.commit()
+            self.stats["appended"] += 1
+            self._pending += 1
+            full = self._pending >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Send one batch. Returns the number of records written."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, collection, ts, payload FROM spool ORDER BY id LIMIT ?",
+                (self.batch_size,)).fetchall()
+        if not rows:
+            return 0
+
+        # One collection per batch; rows for other collections go in a later batch
+        collection = rows[0][1]
+        rows = [row for row in rows if row[1] == collection]
+        records = []
+        for _, _, ts, payload in rows:
+            record = json.loads(payload)
+            record["timestamp"] = datetime.datetime.fromtimestamp(ts)
+            records.append(record)
+
+        start = time.perf_counter()
+        self.backend.write_batch(collection, records)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._conn.executemany("DELETE FROM spool WHERE id = ?", [(row[0],) for row in rows])
+            self._conn.commit()
+            self._pending -= len(rows)
+            self.stats["flushed"] += len(rows)
+            self.stats["last_flush_ms"] = elapsed_ms
+            self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], elapsed_ms)
+        return len(rows)
+
+    def close(self, timeout=10.0):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        with self._lock:
+            self._conn.close()
+
+    def _run(self):
+        backoff = Backoff(self.flush_interval, self.max_backoff)
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                # Drain full batches; a partial batch waits for the next interval
+                while self.flush() == self.batch_size and not self._stop.is_set():
+                    pass
+                backoff.reset()
+            except Exception as e:
+                self.stats["failed_flushes"] += 1
+                print(f"Telemetry flush failed, {self.queue_depth} records spooled: {e}")
+                self._stop.wait(backoff.next())
@@ -0,0 +1,110 @@
+import datetime
+import time
+
+import pytest
+
+from telemetry_writer import TelemetryWriter
+
+
+class FakeFirestore:
+    """Keeps every committed batch; while `outage` holds an error, commits raise it."""
+
+    def __init__(self):
+        self.outage = None
+        self.batches = []
+
+    def write_batch(self, collection, records):
+        if self.outage is not None:
+            raise self.outage
+        self.batches.append((collection, list(records)))
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return str(tmp_path / "spool.db")
+
+
+def test_append_spools_until_flushed(spool):
+    firestore = FakeFirestore()
+    # A long interval: the background thread stays out of the way
+    writer = TelemetryWriter(firestore, spool_path=spool, batch_size=10, flush_interval=60.0)
+    when = datetime.datetime(2024, 1, 1, 2, 30)
+    writer.append("temperature", {"value": 36.6, "timestamp": when})
+    writer.append("temperature", {"value": 36.7})
+    assert writer.queue_depth == 2
+    assert firestore.batches == []
+
+    assert writer.flush() == 2
+    assert writer.queue_depth == 0
+    collection, records = firestore.batches[0]
+    assert collection == "temperature"
+    assert [record["value"] for record in records] == [36.6, 36.7]
+    assert records[0]["timestamp"] == when
+    assert isinstance(records[1]["timestamp"], datetime.datetime)
+    writer.close()
+
+
+def test_one_collection_per_batch(spool):
+    firestore = FakeFirestore()
+    writer = TelemetryWriter(firestore, spool_path=spool, batch_size=10, flush_interval=60.0)
+    writer.append("temperature", {"value": 1})
+    writer.append("humidity", {"value": 2})
+    writer.append("temperature", {"value": 3})
+    assert writer.flush() == 2
+    assert writer.flush() == 1
+    assert [(name, len(records)) for name, records in firestore.batches] == [("temperature", 2), ("humidity", 1)]
+    writer.close()
+
+
+def test_failed_flush_keeps_the_records(spool):
+    firestore = FakeFirestore()
+    writer = TelemetryWriter(firestore, spool_path=spool, batch_size=10, flush_interval=60.0)
+    writer.append("temperature", {"value": 1})
+    firestore.outage = ConnectionError("network is unreachable")
+    with pytest.raises(ConnectionError):
+        writer.flush()
+    assert writer.queue_depth == 1
+    firestore.outage = None
+    assert writer.flush() == 1
+    assert writer.queue_depth == 0
+    assert len(firestore.batches) == 1
+    writer.close()
+
+
+def test_spool_survives_a_restart(spool):
+    firestore = FakeFirestore()
+    firestore.outage = ConnectionError("network is unreachable")
+    writer = TelemetryWriter(firestore, spool_path=spool, batch_size=10, flush_interval=60.0)
+    for value in range(3):
+        writer.append("temperature", {"value": value})
+    writer.close()
+
+    firestore = FakeFirestore()
+    writer = TelemetryWriter(firestore, spool_path=spool, batch_size=10, flush_interval=60.0)
+    assert writer.queue_depth == 3
+    assert writer.flush() == 3
+    assert [record["value"] for record in firestore.batches[0][1]] == [0, 1, 2]
+    writer.close()
+
+
+def test_background_flush_backs_off_and_recovers(spool):
+    firestore = FakeFirestore()
+    firestore.outage = ConnectionError("network is unreachable")
+    writer = TelemetryWriter(firestore, spool_path=spool, batch_size=5, flush_interval=0.05, max_backoff=0.2)
+    for value in range(12):
+        writer.append("temperature", {"value": value})
+    assert wait_for(lambda: writer.stats["failed_flushes"] >= 2)
+    firestore.outage = None
+    assert wait_for(lambda: writer.queue_depth == 0)
+    writer.close()
+
+    assert writer.stats["flushed"] == 12
+    values = [record["value"] for _, records in firestore.batches for record in records]
+    assert values == list(range(12))
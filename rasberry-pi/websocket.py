@@ -1,69 +1,110 @@
 import asyncio
 import websockets
-import base64
+import os
+import socket
+import sys
 import time
-import requests
+from io import BytesIO
 from picamzero import Camera
-from threading import Thread
-import os
+from threading import Lock, Thread
+from frame_broadcaster import FrameBroadcaster
+from inference_client import InferenceClient, LandmarkInferenceClient, StreamingInferenceClient
 
-# Global variables
-latest_image = None
-latest_result = None
+# Each captured frame and its result are serialised once and pushed to all clients
+broadcaster = FrameBroadcaster()
 
-# Function to capture an image every 1 second
-def capture_images():
-    global latest_image, latest_result
+# Remote posture API and capture pacing
+INFERENCE_URL = 'https://babysphere-2-0.onrender.com/process-frame/'
+# One persistent connection for all frames; set to None to POST each frame to INFERENCE_URL
+INFERENCE_STREAM_URL = 'wss://babysphere-2-0.onrender.com/ws/process-frames'
+# Run pose on the Pi and upload only landmarks (528 bytes a frame); the full
+# frame goes to INFERENCE_URL when an alert fires. Needs mediapipe on the Pi.
+EDGE_POSE = False
+LANDMARK_URL = 'https://babysphere-2-0.onrender.com/process-landmark/'
+MAX_IN_FLIGHT = 3
+# Identifies this camera to the server (its result cache is per camera)
+CAMERA_ID = socket.gethostname()
+MIN_CAPTURE_INTERVAL = 0.2
+MAX_CAPTURE_INTERVAL = 2.0
+
+last_published = 0
+publish_lock = Lock()
+
+# Publish a frame with its result, ignoring results that arrive after a newer one
+def publish_result(seq, image_data, result):
+    global last_published
+    with publish_lock:
+        if seq <= last_published:
+            return
+        last_published = seq
+    broadcaster.publish_threadsafe(image_data, result)
+
+edge_pose = None
+if EDGE_POSE:
+    import numpy as np
+
+    # Shared pose helpers live in posture-detection/
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "posture-detection"))
+    from inference_profiles import create_pose, load_profile
+    from posture_classifier import pack_landmarks, results_to_array
+    from roi_tracker import RoiTracker
+
+    profile_name, profile = load_profile("pi4")
+    pose = create_pose(profile)
+    roi_tracker = RoiTracker(max_side=profile["max_side"], reset_on_move=not profile["static_image_mode"])
+
+    # Landmarks of a captured (RGB) frame, packed for upload
+    def edge_pose(frame):
+        results = roi_tracker.process(pose, np.asarray(frame), rgb=True)
+        return pack_landmarks(results_to_array(results))
 
+    inference = LandmarkInferenceClient(LANDMARK_URL, INFERENCE_URL, publish_result, max_in_flight=MAX_IN_FLIGHT,
+                                        camera_id=CAMERA_ID)
+elif INFERENCE_STREAM_URL:
+    inference = StreamingInferenceClient(INFERENCE_STREAM_URL, publish_result, max_in_flight=MAX_IN_FLIGHT,
+                                         camera_id=CAMERA_ID)
+else:
+    inference = InferenceClient(INFERENCE_URL, publish_result, max_in_flight=MAX_IN_FLIGHT, camera_id=CAMERA_ID)
+
+# Encode a captured frame straight into an in-memory JPEG
+def encode_jpeg(frame):
+    with BytesIO() as output:
+        frame.save(output, format="JPEG")
+        return output.getvalue()
+
+# Function to capture images at a rate matched to the API round-trip time
+def capture_images():
     cam = Camera()
+    seq = 0
 
     while True:
-        # Take photo and read it as binary
-        image_path = os.path.expanduser("~/Desktop/new_image.jpg")
-        cam.take_photo(image_path)
-        
-        with open(image_path, "rb") as image_file:
-            image_data = image_file.read()
-            latest_image = base64.b64encode(image_data).decode('utf-8')
-
-        # Send the image to the API
-        files = {
-            'file': ('image.jpg', image_data, 'image/jpeg')
-        }
-        try:
-            response = requests.post('https://babysphere-2-0.onrender.com/process-frame/', files=files)
-            if response.status_code == 200:
-                latest_result = response.json().get("alert", "No alert received")
-            else:
-                latest_result = f"Error: {response.status_code}"
-        except Exception as e:
-            latest_result = f"Error: {str(e)}"
-
-        time.sleep(1)
+        started = time.monotonic()
+        seq += 1
+        frame = cam.capture_image()
+        image_data = encode_jpeg(frame)
+
+        # Blocks only while MAX_IN_FLIGHT requests are outstanding
+        if edge_pose is not None:
+            inference.submit(seq, image_data, edge_pose(frame))
+        else:
+            inference.submit(seq, image_data)
+
+        interval = inference.capture_interval(MIN_CAPTURE_INTERVAL, MAX_CAPTURE_INTERVAL)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
 
 # WebSocket server to share image and result
-async def websocket_handler(websocket, path):
-    global latest_image, latest_result
+async def websocket_handler(websocket, path=None):
+    await broadcaster.serve(websocket)
 
-    while True:
-        if latest_image:
-            message = {
-                "image": latest_image,
-                "result": latest_result if latest_result else "No result available"
-            }
-            await websocket.send(str(message))
-        await asyncio.sleep(1)
-
-# Start the WebSocket server
-async def start_websocket_server():
-    server = await websockets.serve(websocket_handler, "0.0.0.0", 8765)
-    await server.wait_closed()
-
-# Thread to run the camera capture
-camera_thread = Thread(target=capture_images)
-camera_thread.daemon = True
-camera_thread.start()
-
-# Run the WebSocket server
-asyncio.get_event_loop().run_until_complete(start_websocket_server())
-asyncio.get_event_loop().run_forever()
+# Start the WebSocket server and the camera capture thread
+async def main():
+    broadcaster.bind(asyncio.get_running_loop())
+
+    camera_thread = Thread(target=capture_images)
+    camera_thread.daemon = True
+    camera_thread.start()
+
+    async with websockets.serve(websocket_handler, "0.0.0.0", 8765):
+        await asyncio.Future()
+
+asyncio.run(main())